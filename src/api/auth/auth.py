@@ -0,0 +1,73 @@
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+ROLES_CLAIM = 'roles'
+NOTIFY_CLAIM = 'is_send_notify'
+
+
+class RoleTokenUser(TokenUser):
+    """
+    Пользователь, восстановленный из JWT без обращения к базе.
+    Идентификаторы групп берутся из токена, поэтому проверки ролей
+    (apps.users.roles) не выполняют запросов.
+    """
+
+    def __init__(self, token):
+        super().__init__(token)
+        self._role_ids = frozenset(token[ROLES_CLAIM])
+
+    @cached_property
+    def is_send_notify(self) -> bool:
+        return self.token.get(NOTIFY_CLAIM, False)
+
+
+class RoleJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Аутентификация по JWT без загрузки пользователя из базы: роли
+    и флаг уведомлений передаются в токене. Токены, выданные до
+    появления ролей в токене, обрабатываются с загрузкой пользователя.
+    """
+
+    def get_user(self, validated_token):
+        if ROLES_CLAIM not in validated_token:
+            return JWTAuthentication.get_user(self, validated_token)
+        return super().get_user(validated_token)
+
+
+class AsyncJWTAuthentication(RoleJWTAuthentication):
+    """Аутентификация по JWT с асинхронной загрузкой пользователя для асинхронных представлений."""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        if ROLES_CLAIM in validated_token:
+            return self.get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        return user
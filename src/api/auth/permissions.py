@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from apps.users.roles import ADMINISTRATOR, ahas_role, has_role
+
 
 class IsAdministratorOrReadOnly(permissions.BasePermission):
     """
@@ -11,8 +13,13 @@ class IsAdministratorOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return request.user.is_authenticated
         else:
-            return request.user.groups.filter(name='Администратор').exists()
+            return has_role(request.user, ADMINISTRATOR)
 
+    async def ahas_permission(self, request, view):
+        if request.method in permissions.SAFE_METHODS:
+            return request.user.is_authenticated
+        else:
+            return await ahas_role(request.user, ADMINISTRATOR)
 
 
 class IsAdministrator(permissions.BasePermission):
@@ -22,5 +29,8 @@ class IsAdministrator(permissions.BasePermission):
     """
 
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='Администратор').exists()
+        return has_role(request.user, ADMINISTRATOR)
+
+    async def ahas_permission(self, request, view):
+        return await ahas_role(request.user, ADMINISTRATOR)
 
@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from rest_framework import exceptions
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .auth import NOTIFY_CLAIM, ROLES_CLAIM
+
+
+def get_role_claim(user) -> list:
+    """
+    Возвращает роли пользователя для токена. Читаются из базы в обход кэша
+    ролей: по ним проверяется отзыв ролей, и устаревшее значение из кэша
+    позволило бы выпустить токен с уже отозванной ролью.
+    """
+    return sorted(user.groups.values_list('id', flat=True))
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Выдает пару токенов с ролями пользователя и флагом уведомлений."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[ROLES_CLAIM] = get_role_claim(user)
+        token[NOTIFY_CLAIM] = user.is_send_notify
+        return token
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Обновляет access-токен, предварительно сверяя пользователя с базой.
+    Refresh-токен перестает действовать, если пользователь удален,
+    деактивирован или его роли изменились, и нужно войти заново.
+    Флаг уведомлений в новом access-токене берется из базы.
+    """
+
+    default_error_messages = {
+        'no_active_account': TokenObtainPairSerializer.default_error_messages['no_active_account'],
+        'roles_changed': 'Роли пользователя изменились, необходимо войти заново',
+    }
+
+    def get_user(self, refresh):
+        user = get_user_model()._default_manager.filter(**{
+            api_settings.USER_ID_FIELD: refresh.get(api_settings.USER_ID_CLAIM),
+        }).first()
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise exceptions.AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        return user
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = self.get_user(refresh)
+        roles = get_role_claim(user)
+        # Токены, выданные до появления ролей в токене, получают их при обновлении
+        if ROLES_CLAIM in refresh and refresh[ROLES_CLAIM] != roles:
+            raise exceptions.AuthenticationFailed(self.error_messages['roles_changed'], 'roles_changed')
+
+        refresh[ROLES_CLAIM] = roles
+        refresh[NOTIFY_CLAIM] = user.is_send_notify
+        return super().validate({**attrs, 'refresh': str(refresh)})
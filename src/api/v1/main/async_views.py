@@ -0,0 +1,116 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.urls import URLPattern
+from rest_framework import permissions
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from api.auth.auth import AsyncJWTAuthentication
+from apps.users.roles import aget_group_ids, aget_user_role_ids
+
+READ_ACTIONS = ('list', 'retrieve')
+
+
+async def check_permissions(view, request) -> bool:
+    """Проверяет разрешения представления асинхронными вариантами проверок."""
+    for permission in view.get_permissions():
+        if isinstance(permission, permissions.AllowAny):
+            continue
+        check = getattr(permission, 'ahas_permission', None)
+        if check is None or not await check(request, view):
+            return False
+    return True
+
+
+async def handle_read(sync_view, request, args, kwargs):
+    """
+    Обрабатывает list/retrieve асинхронно: аутентификация, разрешения,
+    запросы к базе и сборка ответа выполняются без перехода в поток.
+    Возвращает None, если запрос нужно обработать обычным синхронным
+    представлением: нет асинхронного обработчика, нужен не JSON, клиент
+    не аутентифицирован по JWT, доступ запрещен или произошла ошибка.
+    Так ответы с ошибками всегда формирует DRF.
+    """
+    action = sync_view.actions.get(request.method.lower())
+    if request.method != 'GET' or action not in READ_ACTIONS:
+        return None
+
+    view = sync_view.cls(**sync_view.initkwargs)
+    view.action_map = sync_view.actions
+    # Как в ViewSetMixin.as_view: методы HTTP связываются с действиями (нужно для заголовка Allow)
+    for method, method_action in sync_view.actions.items():
+        setattr(view, method, getattr(view, method_action))
+    view.action = action
+    view.args = args
+    view.kwargs = kwargs
+    view.headers = view.default_response_headers
+    handler = getattr(view, f'a{action}', None)
+    if handler is None:
+        return None
+    if not any(isinstance(authenticator, JWTAuthentication) for authenticator in view.get_authenticators()):
+        return None
+
+    try:
+        drf_request = view.initialize_request(request, *args, **kwargs)
+        view.request = drf_request
+        view.format_kwarg = view.get_format_suffix(**kwargs)
+
+        renderer, media_type = view.perform_content_negotiation(drf_request)
+        if not isinstance(renderer, JSONRenderer):
+            return None
+        drf_request.accepted_renderer, drf_request.accepted_media_type = renderer, media_type
+
+        authenticated = await AsyncJWTAuthentication().aauthenticate(drf_request)
+        if authenticated is None:
+            return None
+        drf_request.user, drf_request.auth = authenticated
+
+        # Роли пользователя запоминаются на нем, дальнейшие синхронные проверки не обращаются к базе
+        await aget_group_ids()
+        await aget_user_role_ids(drf_request.user)
+        if not await check_permissions(view, drf_request):
+            return None
+
+        response = await handler(drf_request, *args, **kwargs)
+    except APIException:
+        return None
+    if response is None:
+        return None
+
+    response = view.finalize_response(drf_request, response, *args, **kwargs)
+    if not isinstance(response, Response):
+        return response
+    # Отрисованный ответ отдается как HttpResponse, иначе Django
+    # вызовет render() ответа DRF в потоке
+    response.render()
+    return HttpResponse(response.content, status=response.status_code, headers=dict(response.items()))
+
+
+def make_async_read_view(sync_view):
+    """
+    Оборачивает представление набора DRF в асинхронное: list/retrieve
+    обрабатываются нативно асинхронно, остальные запросы — исходным
+    представлением в потоке.
+    """
+
+    async def view(request, *args, **kwargs):
+        response = await handle_read(sync_view, request, args, kwargs)
+        if response is None:
+            response = await sync_to_async(sync_view)(request, *args, **kwargs)
+        return response
+
+    functools.update_wrapper(view, sync_view)
+    return view
+
+
+def make_async_urlpatterns(urlpatterns, viewsets) -> list:
+    """Заменяет представления указанных наборов в маршрутах роутера асинхронными."""
+    return [
+        URLPattern(pattern.pattern, make_async_read_view(pattern.callback), pattern.default_args, pattern.name)
+        if getattr(pattern.callback, 'cls', None) in viewsets else pattern
+        for pattern in urlpatterns
+    ]
@@ -0,0 +1,44 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+
+from apps.main.models import CustomerCar, Service
+from apps.users.models import CustomUser
+
+
+def _collect_ids(items, field_names, pk_field):
+    ids = set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        for field_name in field_names:
+            try:
+                value = pk_field.to_python(item.get(field_name))
+            except DjangoValidationError:
+                continue
+            if value is not None:
+                ids.add(value)
+    return ids
+
+
+def prefetch_order_relations(items) -> dict:
+    """
+    Загружает все услуги, машины клиентов и пользователей,
+    на которые ссылаются заказы пачки, вместе с ролями пользователей.
+    Количество запросов не зависит от размера пачки.
+    """
+    service_ids = _collect_ids(items, ('service',), Service._meta.pk)
+    customer_car_ids = _collect_ids(items, ('customer_car',), CustomerCar._meta.pk)
+    user_ids = _collect_ids(items, ('employee', 'administrator',), CustomUser._meta.pk)
+
+    users = CustomUser.objects.in_bulk(user_ids)
+    role_ids = {user_id: set() for user_id in users}
+    memberships = CustomUser.groups.through.objects.filter(customuser_id__in=users)
+    for user_id, group_id in memberships.values_list('customuser_id', 'group_id'):
+        role_ids[user_id].add(group_id)
+    for user_id, user in users.items():
+        user._role_ids = frozenset(role_ids[user_id])
+
+    return {
+        Service: Service.objects.in_bulk(service_ids),
+        CustomerCar: CustomerCar.objects.select_related('customer').in_bulk(customer_car_ids),
+        CustomUser: users,
+    }
@@ -0,0 +1,185 @@
+from collections import defaultdict
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, ForeignKey, ManyToManyField, OneToOneField
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+# Поля, у которых to_representation возвращает значение из базы без изменений
+IDENTITY_REPRESENTATIONS = (
+    serializers.CharField.to_representation,
+    serializers.IntegerField.to_representation,
+    serializers.BooleanField.to_representation,
+)
+
+VALUE, FILE, NESTED, MANY = range(4)
+PARENT_KEY = '_compiled_parent'
+
+
+class NotCompilable(Exception):
+    """Сериализатор использует поля, которые нельзя собрать из .values()."""
+
+
+class CompiledSerializer:
+    """
+    Сериализатор только для чтения, собирающий ответ из строк .values()
+    по заранее вычисленному плану полей, без создания вложенных сериализаторов.
+    Результат совпадает с выводом исходного сериализатора.
+
+    Связи многие-ко-многим загружаются одним дополнительным запросом на отношение.
+    """
+
+    def __init__(self, serializer, model=None):
+        self.model = model or serializer.Meta.model
+        self.columns = []
+        self.many = []
+        self.children = {}
+        self.entries = self._compile(serializer, self.model, '')
+
+    def _add_column(self, column) -> str:
+        if column not in self.columns:
+            self.columns.append(column)
+        return column
+
+    def _get_child(self, serializer_class):
+        if serializer_class not in self.children:
+            self.children[serializer_class] = CompiledSerializer(serializer_class())
+        return self.children[serializer_class]
+
+    def _get_model_field(self, model, source_attrs):
+        field = None
+        for attr in source_attrs:
+            if field is not None:
+                if not field.is_relation or field.many_to_many:
+                    raise NotCompilable(attr)
+                model = field.related_model
+            try:
+                field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                raise NotCompilable(attr)
+        return field
+
+    def _compile(self, serializer, model, prefix) -> tuple:
+        entries = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or isinstance(field, (serializers.SerializerMethodField, serializers.HiddenField)):
+                raise NotCompilable(name)
+
+            model_field = self._get_model_field(model, field.source_attrs)
+            path = prefix + '__'.join(field.source_attrs)
+
+            if isinstance(field, serializers.ListSerializer):
+                if not isinstance(model_field, ManyToManyField) or field.source_attrs != [model_field.name] \
+                        or not isinstance(field.child, serializers.ModelSerializer):
+                    raise NotCompilable(name)
+                key = self._add_column(prefix + model._meta.pk.name)
+                child = self._get_child(type(field.child))
+                self.many.append((key, child, model_field.related_query_name()))
+                entries.append((name, MANY, key, len(self.many) - 1))
+            elif isinstance(field, serializers.ModelSerializer):
+                if not isinstance(model_field, (ForeignKey, OneToOneField)):
+                    raise NotCompilable(name)
+                related_model = model_field.related_model
+                key = self._add_column(f'{path}__{related_model._meta.pk.name}')
+                entries.append((name, NESTED, key, self._compile(field, related_model, path + '__')))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                if field.pk_field is not None or model_field.many_to_many:
+                    raise NotCompilable(name)
+                entries.append((name, VALUE, self._add_column(path), None))
+            elif isinstance(field, serializers.RelatedField) or model_field.is_relation:
+                raise NotCompilable(name)
+            elif isinstance(field, serializers.FileField):
+                use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+                entries.append((name, FILE, self._add_column(path), model_field.storage if use_url else None))
+            else:
+                represent = type(field).to_representation
+                converter = None if represent in IDENTITY_REPRESENTATIONS else field.to_representation
+                entries.append((name, VALUE, self._add_column(path), converter))
+        return tuple(entries)
+
+    def get_relation_pks(self, rows) -> dict:
+        """
+        Собирает первичные ключи родителей для связей многие-ко-многим.
+        Связи с одним сериализатором и одним отношением (например, группы
+        работника и администратора заказа) загружаются одним общим запросом.
+        """
+        pks = defaultdict(set)
+        for key, child, query_name in self.many:
+            pks[child, query_name].update(row[key] for row in rows if row[key] is not None)
+        return pks
+
+    def get_related_queryset(self, query_name, pks):
+        return (
+            self.model._default_manager
+            .filter(**{f'{query_name}__in': pks})
+            .values(*self.columns, **{PARENT_KEY: F(query_name)})
+        )
+
+    def group_related(self, rows, related, request) -> dict:
+        """Возвращает словарь {первичный ключ родителя: список данных связанных объектов}."""
+        values = {}
+        for row in rows:
+            values.setdefault(row[PARENT_KEY], []).append(self.build(self.entries, row, related, request))
+        return values
+
+    def fetch_many(self, rows, request) -> list:
+        """Загружает связи многие-ко-многим для строк."""
+        loaded = {}
+        for (child, query_name), pks in self.get_relation_pks(rows).items():
+            child_rows = list(child.get_related_queryset(query_name, pks)) if pks else []
+            loaded[child, query_name] = child.group_related(child_rows, child.fetch_many(child_rows, request), request)
+        return [loaded[child, query_name] for _, child, query_name in self.many]
+
+    async def afetch_many(self, rows, request) -> list:
+        """Асинхронный вариант fetch_many."""
+        loaded = {}
+        for (child, query_name), pks in self.get_relation_pks(rows).items():
+            child_rows = [row async for row in child.get_related_queryset(query_name, pks).aiterator()] if pks else []
+            related = await child.afetch_many(child_rows, request)
+            loaded[child, query_name] = child.group_related(child_rows, related, request)
+        return [loaded[child, query_name] for _, child, query_name in self.many]
+
+    def build(self, entries, row, related, request) -> dict:
+        result = {}
+        for name, kind, column, payload in entries:
+            value = row[column]
+            if kind == VALUE:
+                result[name] = value if value is None or payload is None else payload(value)
+            elif kind == NESTED:
+                result[name] = None if value is None else self.build(payload, row, related, request)
+            elif kind == MANY:
+                result[name] = related[payload].get(value, [])
+            elif not value:
+                result[name] = None
+            elif payload is None:
+                result[name] = value
+            else:
+                url = payload.url(value)
+                result[name] = request.build_absolute_uri(url) if request is not None else url
+        return result
+
+    def serialize(self, rows, request=None) -> list:
+        """Преобразует строки queryset.values(*columns) в данные ответа."""
+        rows = list(rows)
+        related = self.fetch_many(rows, request)
+        return [self.build(self.entries, row, related, request) for row in rows]
+
+    async def aserialize(self, rows, request=None) -> list:
+        """Асинхронный вариант serialize для уже выбранных строк."""
+        related = await self.afetch_many(rows, request)
+        return [self.build(self.entries, row, related, request) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def compile_serializer(serializer_class):
+    """
+    Возвращает скомпилированный сериализатор для класса сериализатора
+    или None, если его поля нельзя собрать из .values().
+    """
+    try:
+        return CompiledSerializer(serializer_class())
+    except NotCompilable:
+        return None
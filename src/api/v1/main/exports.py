@@ -0,0 +1,64 @@
+import csv
+import json
+from datetime import datetime
+
+
+# Столбцы выгрузки заказов: (заголовок, путь к полю)
+ORDER_EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('status', 'status'),
+    ('start_date', 'start_date'),
+    ('end_date', 'end_date'),
+    ('service_id', 'service_id'),
+    ('service', 'service__name'),
+    ('service_category', 'service__service_category__name'),
+    ('price', 'service__price'),
+    ('customer_car_id', 'customer_car_id'),
+    ('number', 'customer_car__number'),
+    ('brand', 'customer_car__car__brand__name'),
+    ('model', 'customer_car__car__model'),
+    ('customer_email', 'customer_car__customer__email'),
+    ('employee_email', 'employee__email'),
+    ('administrator_email', 'administrator__email'),
+)
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_rows(queryset, columns, chunk_size):
+    """Читает queryset частями, возвращая кортежи значений столбцов."""
+    rows = queryset.values_list(*(path for _, path in columns)).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield tuple(_format_value(value) for value in row)
+
+
+def stream_csv(queryset, columns, chunk_size):
+    """Построчно формирует CSV, не загружая queryset в память."""
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _ in columns])
+    for row in iter_rows(queryset, columns, chunk_size):
+        yield writer.writerow(row)
+
+
+def stream_ndjson(queryset, columns, chunk_size):
+    """Построчно формирует NDJSON, не загружая queryset в память."""
+    headers = [header for header, _ in columns]
+    for row in iter_rows(queryset, columns, chunk_size):
+        yield json.dumps(dict(zip(headers, row)), ensure_ascii=False) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
@@ -1,10 +1,14 @@
+from datetime import datetime, time, timedelta
+
 from django.contrib.auth.models import Group
+from django.utils import timezone
 from django_filters import rest_framework as filters
 
 from apps.main.models import (
     Brand, Car, CustomerCar, Order,
     Service, ServiceCategory,
 )
+from apps.main.plates import normalize_plate
 from apps.users.models import CustomUser
 
 
@@ -105,13 +109,28 @@ class CustomerCarFilter(filters.FilterSet):
         queryset=CustomUser.objects.all(),
     )
 
+    number__iexact = filters.CharFilter(field_name='number_normalized', method='filter_number_iexact')
+    number__istartswith = filters.CharFilter(field_name='number_normalized', method='filter_number_istartswith')
+
     class Meta:
         model = CustomerCar
         fields = {
             'year': ['exact', 'gt', 'gte', 'lt', 'lte'],
-            'number': ['exact', 'icontains', 'istartswith'],
+            'number': ['exact', 'icontains'],
         }
 
+    def filter_number_iexact(self, queryset, name, value):
+        """Ищет номер по индексу нормализованного номера"""
+        return queryset.filter(**{name: normalize_plate(value)})
+
+    def filter_number_istartswith(self, queryset, name, value):
+        """Ищет номер по началу диапазоном по индексу нормализованного номера"""
+        prefix = normalize_plate(value)
+        return queryset.filter(**{
+            f'{name}__gte': prefix,
+            f'{name}__lt': prefix + '\uffff',
+        })
+
 
 class OrderFilter(filters.FilterSet):
     """Фильтр заказов"""
@@ -122,7 +141,7 @@ class OrderFilter(filters.FilterSet):
         queryset=Service.objects.all(),
     )
     customer_car = filters.ModelMultipleChoiceFilter(
-        field_name='cutomer_car__id',
+        field_name='customer_car__id',
         to_field_name='id',
         queryset=CustomerCar.objects.all(),
     )
@@ -136,11 +155,24 @@ class OrderFilter(filters.FilterSet):
         to_field_name='id',
         queryset=CustomUser.objects.all(),
     )
+    start_date__date = filters.DateFilter(field_name='start_date', method='filter_date')
+    end_date__date = filters.DateFilter(field_name='end_date', method='filter_date')
 
     class Meta:
         model = Order
         fields = {
             'status': ['exact'],
-            'start_date': ['date', 'year', 'month', 'day', 'week_day', 'range'],
-            'end_date': ['date', 'year', 'month', 'day', 'week_day', 'range'],
-        }
\ No newline at end of file
+            'start_date': ['year', 'month', 'day', 'week_day', 'range'],
+            'end_date': ['year', 'month', 'day', 'week_day', 'range'],
+        }
+
+    def filter_date(self, queryset, name, value):
+        """
+        Фильтрует по дате через диапазон времени,
+        чтобы запрос мог использовать индекс по дате.
+        """
+        start = timezone.make_aware(datetime.combine(value, time.min))
+        return queryset.filter(**{
+            f'{name}__gte': start,
+            f'{name}__lt': start + timedelta(days=1),
+        })
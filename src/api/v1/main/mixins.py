@@ -0,0 +1,207 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from apps.main.catalog import aget_versions, get_versions
+from apps.main.transactions import retry_on_lock
+from apps.users.roles import aget_user_role_ids, get_user_role_ids
+
+from .compiled import compile_serializer
+from .optimizers import optimize_queryset
+
+
+class QueryOptimizationMixin:
+    """
+    Подгружает связанные объекты, нужные сериализатору представления,
+    чтобы количество запросов не зависело от размера страницы.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return optimize_queryset(queryset, self.get_serializer_class())
+
+
+class CompiledReadMixin:
+    """
+    Отдает список через скомпилированный сериализатор: строки читаются
+    через .values() и собираются в ответ без экземпляров моделей и вложенных
+    сериализаторов. Если сериализатор нельзя скомпилировать или режим
+    выключен настройкой COMPILED_READ_SERIALIZERS, используется обычный путь.
+    """
+
+    def list(self, request, *args, **kwargs):
+        compiled = compile_serializer(self.get_serializer_class()) if settings.COMPILED_READ_SERIALIZERS else None
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = [*compiled.columns, *self.get_ordering_columns(queryset)]
+        # values() не поддерживает загрузку связей, они собираются отдельно
+        queryset = queryset.prefetch_related(None).values(*dict.fromkeys(columns))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(compiled.serialize(page, request))
+        return Response(compiled.serialize(queryset, request))
+
+    async def alist(self, request, *args, **kwargs):
+        """
+        Асинхронный вариант list. Возвращает None, если запрос
+        нельзя обработать асинхронно, и тогда используется обычный путь.
+        """
+        compiled = compile_serializer(self.get_serializer_class()) if settings.COMPILED_READ_SERIALIZERS else None
+        paginator = self.paginator
+        if compiled is None or (paginator is not None and not hasattr(paginator, 'apaginate_queryset')):
+            return None
+
+        queryset = await self.afilter_queryset(self.get_queryset())
+        columns = [*compiled.columns, *self.get_ordering_columns(queryset)]
+        queryset = queryset.prefetch_related(None).values(*dict.fromkeys(columns))
+
+        if paginator is None:
+            rows = [row async for row in queryset.aiterator()]
+            return Response(await compiled.aserialize(rows, request))
+
+        page = await paginator.apaginate_queryset(queryset, request, view=self)
+        return self.get_paginated_response(await compiled.aserialize(page, request))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        """Асинхронный вариант retrieve. Возвращает None, если нужен обычный путь."""
+        compiled = compile_serializer(self.get_serializer_class()) if settings.COMPILED_READ_SERIALIZERS else None
+        if compiled is None:
+            return None
+
+        queryset = await self.afilter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            row = await (
+                queryset.prefetch_related(None)
+                .filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+                .values(*compiled.columns)
+                .afirst()
+            )
+        except (DjangoValidationError, TypeError, ValueError):
+            return None
+        # Ответ 404 сформирует обычный путь
+        if row is None:
+            return None
+        return Response((await compiled.aserialize([row], request))[0])
+
+    async def afilter_queryset(self, queryset):
+        """
+        Применяет фильтры. Проверка значений фильтров по связанным моделям
+        обращается к базе синхронно, поэтому при их наличии выполняется в потоке.
+        """
+        filterset_class = getattr(self, 'filterset_class', None)
+        if filterset_class is not None and set(self.request.query_params) & set(filterset_class.base_filters):
+            return await sync_to_async(self.filter_queryset)(queryset)
+        return self.filter_queryset(queryset)
+
+    def get_ordering_columns(self, queryset) -> list:
+        """Поля сортировки, которые пагинатор по курсору читает из строк."""
+        ordering = list(queryset.query.order_by)
+        paginator = self.paginator
+        if paginator is not None and hasattr(paginator, 'get_ordering'):
+            ordering.extend(paginator.get_ordering(self.request, queryset, self))
+        return [field.lstrip('-') for field in ordering if isinstance(field, str)]
+
+
+class LockRetryMixin:
+    """
+    Выполняет изменяющие действия в транзакции и повторяет их,
+    если база заблокирована другим процессом.
+    """
+
+    @retry_on_lock
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @retry_on_lock
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    @retry_on_lock
+    def destroy(self, request, *args, **kwargs):
+        return super().destroy(request, *args, **kwargs)
+
+
+class CachedResponseMixin:
+    """
+    Кэширует ответы list/retrieve по адресу запроса, параметрам и ролям
+    пользователя. Кэш сбрасывается при изменении моделей из cache_models.
+    Поддерживает условные запросы: ETag вычисляется по содержимому ответа,
+    поэтому 304 отдается, только если ответ действительно не изменился.
+    """
+
+    cache_models = ()
+    cache_timeout = settings.CATALOG_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cache_key(self, request, versions) -> str:
+        parts = (
+            request.build_absolute_uri(request.path),
+            sorted(request.query_params.lists()),
+            sorted(get_user_role_ids(request.user)),
+            versions,
+        )
+        return 'catalog:entry:' + hashlib.md5(repr(parts).encode()).hexdigest()
+
+    def make_cache_entry(self, data, versions) -> tuple:
+        """Возвращает данные ответа, ETag по их содержимому и время последнего изменения."""
+        etag = '"' + hashlib.md5(JSONRenderer().render(data)).hexdigest() + '"'
+        return data, etag, int(max(versions))
+
+    def make_cached_response(self, request, entry):
+        data, etag, last_modified = entry
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        return Response(data, headers={
+            'ETag': etag,
+            'Last-Modified': http_date(last_modified),
+        })
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        versions = get_versions(self.cache_models)
+        key = self.get_cache_key(request, versions)
+
+        entry = cache.get(key)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = self.make_cache_entry(response.data, versions)
+            cache.set(key, entry, timeout=self.cache_timeout)
+
+        return self.make_cached_response(request, entry)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aget_cached_response(request)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aget_cached_response(request)
+
+    async def aget_cached_response(self, request):
+        """
+        Асинхронно отдает ответ из кэша. Если ответа в кэше нет,
+        возвращает None, и запрос обрабатывается синхронно с записью в кэш.
+        """
+        await aget_user_role_ids(request.user)
+        key = self.get_cache_key(request, await aget_versions(self.cache_models))
+
+        entry = await cache.aget(key)
+        if entry is None:
+            return None
+        return self.make_cached_response(request, entry)
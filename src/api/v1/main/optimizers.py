@@ -0,0 +1,57 @@
+from functools import lru_cache
+
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+@lru_cache(maxsize=None)
+def get_query_plan(serializer_class):
+    """
+    Обходит дерево вложенных сериализаторов и возвращает план загрузки
+    связанных объектов: пути для select_related и список
+    (путь, модель, вложенный план) для prefetch_related.
+    """
+    return _build_plan(serializer_class())
+
+
+def _build_plan(serializer, prefix=''):
+    select_related = []
+    prefetch_related = []
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+
+        path = prefix + '__'.join(field.source_attrs)
+
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+            if isinstance(child, serializers.ModelSerializer):
+                prefetch_related.append((path, child.Meta.model, _build_plan(child)))
+        elif isinstance(field, serializers.ModelSerializer):
+            nested_select, nested_prefetch = _build_plan(field, prefix=path + '__')
+            select_related.append(path)
+            select_related.extend(nested_select)
+            prefetch_related.extend(nested_prefetch)
+
+    return tuple(select_related), tuple(prefetch_related)
+
+
+def _apply_plan(queryset, plan):
+    select_related, prefetch_related = plan
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*(
+            Prefetch(path, queryset=_apply_plan(model._default_manager.all(), nested_plan))
+            for path, model, nested_plan in prefetch_related
+        ))
+    return queryset
+
+
+def optimize_queryset(queryset, serializer_class):
+    """
+    Добавляет к queryset select_related/prefetch_related,
+    необходимые для сериализации без дополнительных запросов.
+    """
+    return _apply_plan(queryset, get_query_plan(serializer_class))
@@ -0,0 +1,150 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Постраничный вывод по курсору: страница выбирается условием
+    по ключу сортировки вместо OFFSET и без подсчета COUNT(*),
+    поэтому время выборки не зависит от номера страницы.
+
+    Позиция курсора хранит значения всех полей сортировки, а не только
+    первого, как в CursorPagination: строки с равным первым полем
+    разделяются по следующим полям без смещения внутри группы.
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = settings.CURSOR_PAGINATION_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        # Первичный ключ делает порядок строк однозначным при равных значениях
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            ordering += ('-id',) if ordering[0].startswith('-') else ('id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.set_page_results(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Асинхронный вариант paginate_queryset для асинхронных представлений."""
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.set_page_results([item async for item in page_queryset])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Возвращает запрос строк страницы (с одной лишней строкой для поиска
+        следующей страницы), не выполняя его. Повторяет первую часть
+        CursorPagination.paginate_queryset.
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (self.offset, self.reverse, self.current_position) = (0, False, None)
+        else:
+            (self.offset, self.reverse, self.current_position) = self.cursor
+
+        if self.reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self.current_position is not None:
+            try:
+                queryset = queryset.filter(self.get_position_filter(self.current_position))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        return queryset[self.offset:self.offset + self.page_size + 1]
+
+    def get_position_filter(self, position) -> Q:
+        """
+        Возвращает условие для строк после позиции в направлении выборки:
+        (a > x) OR (a = x AND b > y) OR ... для сортировки по (a, b, ...).
+        """
+        values = json.loads(position)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise ValueError(position)
+
+        condition = Q()
+        equal = {}
+        for order, value in zip(self.ordering, values):
+            is_reversed = order.startswith('-')
+            order_attr = order.lstrip('-')
+            lookup = '__lt' if self.cursor.reverse != is_reversed else '__gt'
+            condition |= Q(**equal, **{order_attr + lookup: value})
+            equal[order_attr] = value
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        """Возвращает значения всех полей сортировки строки как строку JSON."""
+        values = []
+        for order in ordering:
+            field_name = order.lstrip('-')
+            attr = instance[field_name] if isinstance(instance, dict) else getattr(instance, field_name)
+            values.append(str(attr))
+        return json.dumps(values, separators=(',', ':'))
+
+    def set_page_results(self, results):
+        """
+        Определяет страницу и соседние позиции курсора по выбранным строкам.
+        Повторяет вторую часть CursorPagination.paginate_queryset.
+        """
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if self.reverse:
+            self.page = list(reversed(self.page))
+
+            self.has_next = (self.current_position is not None) or (self.offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = self.current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (self.current_position is not None) or (self.offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = self.current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class OrderCursorPagination(KeysetPagination):
+    """Постраничный вывод заказов по ключу (start_date, id)"""
+
+    ordering = ('-start_date', '-id',)
+
+
+class CustomerCarCursorPagination(KeysetPagination):
+    """Постраничный вывод машин клиентов по ключу id"""
+
+    ordering = ('id',)
@@ -1,11 +1,42 @@
+from django.conf import settings
 from django.contrib.auth.models import Group
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models
 from rest_framework import serializers
 
 from apps.main.models import (
     Brand, Car, CustomerCar, Order,
     Service, ServiceCategory,
 )
+from apps.main.scheduling import find_overlaps
 from apps.users.models import CustomUser
+from apps.users.roles import ADMINISTRATOR, CUSTOMER, EMPLOYEE, has_role
+
+from .uploads import HeaderImageField
+
+ORDER_OVERLAP_MESSAGE = 'У работника уже есть заказ в это время'
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Поле связи, которое берет объект из заранее загруженных
+    в контекст сериализатора (ключ prefetched), не обращаясь к базе.
+    """
+
+    def to_internal_value(self, data):
+        prefetched = self.context.get('prefetched', {}).get(self.queryset.model)
+        if prefetched is None:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = self.queryset.model._meta.pk.to_python(data)
+        except DjangoValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in prefetched:
+            self.fail('does_not_exist', pk_value=data)
+        return prefetched[pk]
 
 
 class BrandSerializer(serializers.ModelSerializer):
@@ -49,7 +80,7 @@ class ServiceGetSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Service
-        fields = ('id', 'service_category', 'name', 'price',)
+        fields = ('id', 'service_category', 'name', 'price', 'duration',)
 
 
 class ServiceSerializer(serializers.ModelSerializer):
@@ -57,7 +88,7 @@ class ServiceSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Service
-        fields = ('id', 'service_category', 'name', 'price',)
+        fields = ('id', 'service_category', 'name', 'price', 'duration',)
 
 
 class GroupSerializer(serializers.ModelSerializer):
@@ -124,21 +155,27 @@ class CustomerCarGetSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = CustomerCar
-        fields = ('id', 'car', 'customer', 'year', 'number', 'image',)
+        fields = ('id', 'car', 'customer', 'year', 'number', 'image', 'image_thumbnail', 'image_webp',)
 
 
 class CustomerCarSerializer(serializers.ModelSerializer):
     """Сериализатор для модели машины клиента"""
 
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: HeaderImageField,
+    }
+
     class Meta:
         model = CustomerCar
-        fields = ('id', 'car', 'customer', 'year', 'number', 'image',)
+        fields = ('id', 'car', 'customer', 'year', 'number', 'image', 'image_thumbnail', 'image_webp',)
+        read_only_fields = ('image_thumbnail', 'image_webp',)
 
     def validate_customer(self, value):
         """
         Проверяет, что клиент действительно относится к группе клиентов.
         """
-        if not value.groups.filter(name='Клиент').exists():
+        if not has_role(value, CUSTOMER):
             raise serializers.ValidationError('Выбранный клиент не является клиентом на самом деле')
         return value
 
@@ -154,22 +191,84 @@ class OrderGetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ('id', 'service', 'customer_car', 'employee',
-                  'administrator', 'status', 'start_date', 'end_date',)
+                  'administrator', 'status', 'start_date', 'end_date', 'version',)
+
+
+class DashboardCarSerializer(CustomerCarGetSerializer):
+    """Сериализатор машины клиента для сводки клиента"""
+
+    class Meta(CustomerCarGetSerializer.Meta):
+        fields = ('id', 'car', 'year', 'number', 'image', 'image_thumbnail', 'image_webp',)
+
+
+class DashboardOrderSerializer(serializers.ModelSerializer):
+    """Сериализатор заказа для сводки клиента"""
+
+    service = ServiceGetSerializer()
+    employee = CustomUserCutSerializer()
+
+    class Meta:
+        model = Order
+        fields = ('id', 'service', 'customer_car', 'employee', 'status', 'start_date', 'end_date', 'version',)
 
 
 class OrderSerializer(serializers.ModelSerializer):
     """Сериализатор для модели заказа"""
 
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
+    # При изменении — версия заказа, которую видел клиент. Если она устарела, ответ 409
+    version = serializers.IntegerField(min_value=0, required=False)
+
     class Meta:
         model = Order
         fields = ('id', 'service', 'customer_car', 'employee',
-                  'administrator', 'status', 'start_date', 'end_date',)
+                  'administrator', 'status', 'start_date', 'end_date', 'version',)
+
+    def validate(self, attrs):
+        """
+        Проверяет, что заказ завершается позже, чем начинается,
+        длится не дольше допустимого и не пересекается с другими
+        заказами работника. Пачки заказов проверяются на пересечение
+        целиком (context['check_overlaps'] = False).
+        """
+        if self.instance is None:
+            attrs.pop('version', None)
+        start_date = attrs.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = attrs.get('end_date', getattr(self.instance, 'end_date', None))
+        if start_date and end_date:
+            if end_date <= start_date:
+                raise serializers.ValidationError({'end_date': 'Заказ должен завершаться позже, чем начинается'})
+            if end_date - start_date > settings.ORDER_MAX_DURATION:
+                raise serializers.ValidationError({'end_date': 'Слишком большая длительность заказа'})
+            if self.context.get('check_overlaps', True):
+                self.check_overlaps(attrs, start_date, end_date)
+        return attrs
+
+    def check_overlaps(self, attrs, start_date, end_date):
+        if self.instance is not None and not {'employee', 'start_date', 'end_date'} & attrs.keys():
+            return
+        employee_id = attrs['employee'].pk if 'employee' in attrs else getattr(self.instance, 'employee_id', None)
+        if employee_id is None:
+            return
+        exclude_ids = [self.instance.pk] if self.instance is not None else []
+        if find_overlaps([(employee_id, start_date, end_date)], exclude_ids)[0]:
+            raise serializers.ValidationError({'employee': ORDER_OVERLAP_MESSAGE})
+
+    def validate_status(self, value):
+        """
+        Проверяет, что изменение статуса допустимо.
+        """
+        if self.instance is not None and value != self.instance.status \
+                and value not in Order.STATUS_TRANSITIONS[self.instance.status]:
+            raise serializers.ValidationError('Недопустимое изменение статуса заказа')
+        return value
 
     def validate_employee(self, value):
         """
         Проверяет, что клиент действительно относится к группе клиентов.
         """
-        if not value.groups.filter(name='Работник').exists():
+        if not has_role(value, EMPLOYEE):
             raise serializers.ValidationError('Выбранный работник не является работником на самом деле')
         return value
 
@@ -177,6 +276,62 @@ class OrderSerializer(serializers.ModelSerializer):
         """
         Проверяет, что клиент действительно относится к группе клиентов.
         """
-        if not value.groups.filter(name='Администратор').exists():
+        if not has_role(value, ADMINISTRATOR):
             raise serializers.ValidationError('Выбранный администратор не является администратором на самом деле')
         return value
+
+
+class FreeSlotsQuerySerializer(serializers.Serializer):
+    """Сериализатор параметров поиска свободного времени работников"""
+
+    service = serializers.PrimaryKeyRelatedField(queryset=Service.objects.all())
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    employee = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all(), required=False)
+
+    def validate_employee(self, value):
+        """
+        Проверяет, что работник действительно относится к группе работников.
+        """
+        if not has_role(value, EMPLOYEE):
+            raise serializers.ValidationError('Выбранный работник не является работником на самом деле')
+        return value
+
+    def validate(self, attrs):
+        if attrs['end'] <= attrs['start']:
+            raise serializers.ValidationError({'end': 'Окно поиска должно завершаться позже, чем начинается'})
+        if attrs['end'] - attrs['start'] > settings.SCHEDULE_MAX_WINDOW:
+            raise serializers.ValidationError({'end': 'Слишком широкое окно поиска'})
+        return attrs
+
+
+class FreeSlotSerializer(serializers.Serializer):
+    """Сериализатор свободного интервала"""
+
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+
+class EmployeeFreeSlotsSerializer(serializers.Serializer):
+    """Сериализатор свободного времени работника"""
+
+    employee = CustomUserCutSerializer()
+    slots = FreeSlotSerializer(many=True)
+
+
+class RevenueReportQuerySerializer(serializers.Serializer):
+    """Сериализатор параметров отчета по выручке"""
+
+    GROUP_FIELDS = ('day', 'service_category', 'service', 'status',)
+
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    status = serializers.ChoiceField(choices=Order.STATUSES, required=False)
+    group_by = serializers.MultipleChoiceField(choices=GROUP_FIELDS, required=False)
+
+    def validate(self, attrs):
+        if attrs['date_to'] < attrs['date_from']:
+            raise serializers.ValidationError({'date_to': 'Конец периода раньше его начала'})
+        if not attrs.get('group_by'):
+            attrs['group_by'] = {'service_category'}
+        return attrs
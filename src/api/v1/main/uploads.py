@@ -0,0 +1,129 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, TemporaryFileUploadHandler
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException, ValidationError
+
+# Сигнатуры в начале файла и соответствующие форматы Pillow
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+SIGNATURE_LENGTH = 12
+INVALID_IMAGE_MESSAGE = 'Загрузите изображение в формате JPEG, PNG, GIF или WebP.'
+
+
+def detect_image_format(header):
+    """Определяет формат изображения по первым байтам файла или возвращает None."""
+    for signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Размер загружаемого файла превышает допустимый.'
+    default_code = 'upload_too_large'
+
+
+class ImageTemporaryUploadedFile(TemporaryUploadedFile):
+    """Временный файл загрузки в каталоге CAR_IMAGE_UPLOAD_TEMP_DIR."""
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        os.makedirs(settings.CAR_IMAGE_UPLOAD_TEMP_DIR, exist_ok=True)
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(suffix='.upload' + ext, dir=settings.CAR_IMAGE_UPLOAD_TEMP_DIR)
+        UploadedFile.__init__(self, file, name, content_type, size, charset, content_type_extra)
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет загружаемые изображения во временный файл частями, не держа их в памяти.
+    Тип файла проверяется по первым байтам, размер — по мере получения данных,
+    поэтому неподходящая загрузка прерывается до того, как будет прочитана целиком.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.CAR_IMAGE_MAX_UPLOAD_SIZE
+        self.header = b''
+        self.received = 0
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Тело запроса заведомо больше лимита: отказываем, не читая его
+        if content_length and content_length > self.max_size + settings.DATA_UPLOAD_MAX_MEMORY_SIZE:
+            raise UploadTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        FileUploadHandler.new_file(self, *args, **kwargs)
+        self.header = b''
+        self.received = 0
+        # Временный файл на том же диске, что и медиафайлы: перенос на место
+        # выполняется атомарным переименованием, а не копированием
+        self.file = ImageTemporaryUploadedFile(
+            self.file_name, self.content_type, 0, self.charset, self.content_type_extra,
+        )
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.file.close()
+            raise UploadTooLarge()
+
+        if len(self.header) < SIGNATURE_LENGTH:
+            self.header += raw_data[:SIGNATURE_LENGTH - len(self.header)]
+            if len(self.header) >= SIGNATURE_LENGTH and detect_image_format(self.header) is None:
+                self.file.close()
+                raise ValidationError({self.field_name: [INVALID_IMAGE_MESSAGE]})
+
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if detect_image_format(self.header) is None:
+            self.file.close()
+            raise ValidationError({self.field_name: [INVALID_IMAGE_MESSAGE]})
+        return super().file_complete(file_size)
+
+
+class HeaderImageField(serializers.ImageField):
+    """
+    Поле изображения, которое проверяет формат и размеры по заголовку файла.
+    В отличие от стандартного ImageField, изображение не декодируется целиком.
+    """
+
+    default_error_messages = {
+        'invalid_image': 'Загрузите корректное изображение в формате JPEG, PNG, GIF или WebP.',
+        'too_many_pixels': 'Изображение слишком большое: не более {max_pixels} пикселей.',
+    }
+
+    def to_internal_value(self, data):
+        file = serializers.FileField.to_internal_value(self, data)
+
+        try:
+            file.seek(0)
+            with Image.open(file) as image:
+                image_format = image.format
+                width, height = image.size
+        except Image.DecompressionBombError:
+            self.fail('too_many_pixels', max_pixels=settings.CAR_IMAGE_MAX_PIXELS)
+        except (OSError, UnidentifiedImageError):
+            self.fail('invalid_image')
+        finally:
+            file.seek(0)
+
+        if image_format not in settings.CAR_IMAGE_FORMATS:
+            self.fail('invalid_image')
+        if width * height > settings.CAR_IMAGE_MAX_PIXELS:
+            self.fail('too_many_pixels', max_pixels=settings.CAR_IMAGE_MAX_PIXELS)
+
+        file.content_type = Image.MIME.get(image_format, file.content_type)
+        return file
@@ -1,40 +1,72 @@
+from datetime import timedelta
+
 from django.contrib.auth.models import Group
-from django.core.mail import send_mail
-from django.db.models import Q
-from rest_framework import viewsets, generics
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.http import StreamingHttpResponse
+from rest_framework import generics, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from apps.main import dashboard, rollups
 from apps.main.models import (
-    Brand, Car, CustomerCar, Order, Service, ServiceCategory,
+    Brand, Car, CustomerCar, Order, OrderRollup, Service, ServiceCategory,
 )
+from apps.main.orders import OrderConflict, update_order, update_orders
+from apps.main.plates import normalize_plate
+from apps.main.scheduling import build_interval_indexes, find_overlaps
+from apps.main.transactions import retry_on_lock
 from api.auth.permissions import IsAdministrator, IsAdministratorOrReadOnly
 from apps.users.models import CustomUser
+from apps.users.roles import ADMINISTRATOR, EMPLOYEE, get_group_ids, has_role
+from config.slow_queries import get_slow_queries
 
+from .bulk import prefetch_order_relations
+from .exports import EXPORT_FORMATS, ORDER_EXPORT_COLUMNS
 from .filters import (
     BrandFilter, CarFilter, GroupFilter, OrderFilter, ServiceCategoryFilter,
     ServiceFilter, CustomerCarFilter, CustomUserFilter,
 )
+from .mixins import (
+    CachedResponseMixin, CompiledReadMixin, LockRetryMixin, QueryOptimizationMixin,
+)
+from .pagination import CustomerCarCursorPagination, OrderCursorPagination
 from .serializers import (
     BrandSerializer, CarGetSerializer, CarSerializer, GroupSerializer,
     OrderGetSerializer, OrderSerializer, ServiceCategorySerializer,
     ServiceGetSerializer, ServiceSerializer, CustomerCarGetSerializer,
     CustomerCarSerializer, CustomUserGetSerializer, CustomUserWithGroupsSerializer,
-    CustomUserSerializer,
+    CustomUserSerializer, EmployeeFreeSlotsSerializer, FreeSlotsQuerySerializer,
+    RevenueReportQuerySerializer, DashboardCarSerializer, DashboardOrderSerializer,
+    ORDER_OVERLAP_MESSAGE,
 )
+from .uploads import ImageUploadHandler
+
+
+class OrderConflictError(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Заказ изменен параллельно, загрузите его заново'
+    default_code = 'conflict'
 
 
-class BrandViewSet(viewsets.ModelViewSet):
+class BrandViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """API-ендпоинт для работы с марками машин"""
     queryset = Brand.objects.all()
+    cache_models = (Brand,)
     serializer_class = BrandSerializer
     filterset_class = BrandFilter
     ordering_fields = ('name',)
     permission_classes = (IsAdministrator,)
 
 
-class CarViewSet(viewsets.ModelViewSet):
+class CarViewSet(CachedResponseMixin, CompiledReadMixin, QueryOptimizationMixin, viewsets.ModelViewSet):
     """API-ендпоинт для работы с машинами"""
     queryset = Car.objects.all()
+    cache_models = (Car, Brand,)
     filterset_class = CarFilter
     ordering_fields = ('model',)
     permission_classes = (IsAdministrator,)
@@ -46,18 +78,20 @@ class CarViewSet(viewsets.ModelViewSet):
         return CarSerializer
 
 
-class ServiceCategoryViewSet(viewsets.ModelViewSet):
+class ServiceCategoryViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """API-ендпоинт для работы с категориями услуг"""
     queryset = ServiceCategory.objects.all()
+    cache_models = (ServiceCategory,)
     serializer_class = ServiceCategorySerializer
     filterset_class = ServiceCategoryFilter
     ordering_fields = ('name',)
     permission_classes = (IsAdministrator,)
 
 
-class ServiceViewSet(viewsets.ModelViewSet):
+class ServiceViewSet(CachedResponseMixin, CompiledReadMixin, QueryOptimizationMixin, viewsets.ModelViewSet):
     """API-ендпоинт для работы с услугами"""
     queryset = Service.objects.all()
+    cache_models = (Service, ServiceCategory,)
     filterset_class = ServiceFilter
     ordering_fields = ('name', 'price',)
     permission_classes = (IsAdministrator,)
@@ -69,16 +103,17 @@ class ServiceViewSet(viewsets.ModelViewSet):
         return ServiceSerializer
 
 
-class GroupViewSet(viewsets.ModelViewSet):
+class GroupViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """API-ендпоинт для работы с ролями"""
     queryset = Group.objects.all()
+    cache_models = (Group,)
     serializer_class = GroupSerializer
     filterset_class = GroupFilter
     ordering_fields = ('name',)
     permission_classes = (IsAdministrator,)
 
 
-class CustomUserViewSet(viewsets.ModelViewSet):
+class CustomUserViewSet(CompiledReadMixin, QueryOptimizationMixin, viewsets.ModelViewSet):
     """API-ендпоинт для работы с пользователями"""
     queryset = CustomUser.objects.all()
     filterset_class = CustomUserFilter
@@ -87,30 +122,53 @@ class CustomUserViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action in ['list', 'retrieve']:
             return CustomUserGetSerializer
-        if self.request.user.groups.filter(name='Администратор').exists():
+        if has_role(self.request.user, ADMINISTRATOR):
             return CustomUserWithGroupsSerializer
         return CustomUserSerializer
 
 
-class CustomerCarViewSet(viewsets.ModelViewSet):
+class CustomerCarViewSet(CompiledReadMixin, QueryOptimizationMixin, viewsets.ModelViewSet):
     """API-ендпоинт для работы с машинами клиентов"""
     queryset = CustomerCar.objects.all()
     filterset_class = CustomerCarFilter
     ordering_fields = ('year', 'number',)
+    ordering = CustomerCarCursorPagination.ordering
     permission_classes = (IsAdministrator,)
+    pagination_class = CustomerCarCursorPagination
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Фото пишется во временный файл частями с проверкой типа и размера
+        request.upload_handlers = [ImageUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
 
     def get_serializer_class(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'by_number']:
             return CustomerCarGetSerializer
 
         return CustomerCarSerializer
 
+    @action(detail=False, methods=['get'], url_path=r'by-number/(?P<plate>[^/]+)')
+    def by_number(self, request, plate):
+        """
+        Возвращает машины клиентов с указанным номером.
+        Номер сравнивается в нормализованном виде, поэтому регистр,
+        пробелы и кириллические или латинские буквы не важны.
+        """
+        queryset = self.get_queryset().filter(number_normalized=normalize_plate(plate))
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(LockRetryMixin, CompiledReadMixin, QueryOptimizationMixin, viewsets.ModelViewSet):
     """API-ендпоинт для работы с заказами"""
+    queryset = Order.objects.all()
     filterset_class = OrderFilter
     ordering_fields = ('start_date', 'end_date',)
+    ordering = OrderCursorPagination.ordering
     permission_classes = (IsAdministratorOrReadOnly,)
+    pagination_class = OrderCursorPagination
+    bulk_max_items = 500
+    export_chunk_size = 2000
 
     def get_serializer_class(self):
         if self.action in ['list', 'retrieve']:
@@ -119,28 +177,325 @@ class OrderViewSet(viewsets.ModelViewSet):
         return OrderSerializer
 
     def get_queryset(self):
+        queryset = super().get_queryset()
         user = self.request.user
-        if user.groups.filter(name='Администратор').exists():
-            queryset = Order.objects.all()
-        else:
-            queryset = Order.objects.filter(Q(employee=user) | Q(customer_car__customer=user))
+        if not has_role(user, ADMINISTRATOR):
+            # Подзапрос вместо JOIN позволяет SQLite объединить поиск по двум индексам
+            queryset = queryset.filter(Q(employee_id=user.pk) | Q(
+                customer_car__in=CustomerCar.objects.filter(customer_id=user.pk).values('id'),
+            ))
         return queryset
 
+    @retry_on_lock
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
 
-        # Если статус заказа изменен на 1, отправляем сообщение на почту клиента
-        if instance.status != serializer.validated_data['status'] and \
-           serializer.validated_data['status'] == 1 and \
-           instance.customer_car.customer.is_send_notify:
-            send_mail(
-                subject=f'Статус вашего заказа №{instance.pk} изменен',
-                message='Ваш заказ выполнен.',
-                from_email='mufasa133@yandex.ru',
-                recipient_list=[instance.customer_car.customer.email],
-            )
+        data = dict(serializer.validated_data)
+        version = data.pop('version', None)
+        try:
+            # Письмо клиенту о завершении ставится в очередь, только если
+            # завершение применено именно этим запросом
+            update_order(instance, data, version)
+        except OrderConflict:
+            raise OrderConflictError()
 
-        self.perform_update(serializer)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        Выгружает отфильтрованные заказы в CSV или NDJSON (параметр export_format).
+        Строки читаются из базы частями и сразу отдаются клиенту.
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'export_format': f'Допустимые форматы: {", ".join(EXPORT_FORMATS)}'})
+        stream, content_type = EXPORT_FORMATS[export_format]
+
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            stream(queryset, ORDER_EXPORT_COLUMNS, self.export_chunk_size),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="orders.{export_format}"'
+        return response
+
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk')
+    @retry_on_lock
+    def bulk(self, request):
+        """
+        Создает (POST) или частично обновляет (PATCH) пачку заказов.
+        Ошибки возвращаются списком в порядке элементов пачки.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError('Ожидается непустой список заказов')
+        if len(items) > self.bulk_max_items:
+            raise ValidationError(f'Максимальный размер пачки: {self.bulk_max_items}')
+
+        context = self.get_serializer_context()
+        context['prefetched'] = prefetch_order_relations(items)
+        # Пересечения проверяются для всей пачки сразу, включая заказы внутри нее
+        context['check_overlaps'] = False
+
+        if request.method == 'POST':
+            return self._bulk_create(items, context)
+        return self._bulk_update(items, context)
+
+    def _bulk_create(self, items, context):
+        serializers = [OrderSerializer(data=item, context=context) for item in items]
+        errors = [{} if serializer.is_valid() else serializer.errors for serializer in serializers]
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        response = self._check_overlaps([
+            (data['employee'].pk, data['start_date'], data['end_date'])
+            for data in (serializer.validated_data for serializer in serializers)
+        ])
+        if response is not None:
+            return response
+
+        with transaction.atomic():
+            orders = Order.objects.bulk_create(
+                Order(**serializer.validated_data) for serializer in serializers
+            )
+            rollups.record_created(orders)
+            dashboard.invalidate_orders(orders)
+
+        return Response(OrderSerializer(orders, many=True).data, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def _check_overlaps(bookings, exclude_ids=()):
+        """Возвращает ответ 400 с ошибками по элементам пачки, если заказы пересекаются."""
+        overlaps = find_overlaps(bookings, exclude_ids)
+        if any(overlaps):
+            return Response(
+                [{'employee': [ORDER_OVERLAP_MESSAGE]} if overlap else {} for overlap in overlaps],
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return None
+
+    def _bulk_update(self, items, context):
+        pk_field = Order._meta.pk
+        ids = []
+        for item in items:
+            try:
+                ids.append(pk_field.to_python(item.get('id')) if isinstance(item, dict) else None)
+            except DjangoValidationError:
+                ids.append(None)
+
+        instances = self.get_queryset().select_related('customer_car__customer').in_bulk(
+            pk for pk in ids if pk is not None
+        )
+
+        serializers = []
+        errors = []
+        for pk, item in zip(ids, items):
+            instance = instances.get(pk)
+            if instance is None:
+                serializers.append(None)
+                errors.append({'id': ['Заказ не найден']})
+                continue
+            serializer = OrderSerializer(instance, data=item, partial=True, context=context)
+            serializers.append(serializer)
+            errors.append({} if serializer.is_valid() else serializer.errors)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        bookings = []
+        for serializer in serializers:
+            data, instance = serializer.validated_data, serializer.instance
+            bookings.append((
+                data['employee'].pk if 'employee' in data else instance.employee_id,
+                data.get('start_date', instance.start_date),
+                data.get('end_date', instance.end_date),
+            ))
+        response = self._check_overlaps(bookings, exclude_ids=ids)
+        if response is not None:
+            return response
+
+        updates = []
+        for serializer in serializers:
+            data = dict(serializer.validated_data)
+            updates.append((serializer.instance, data, data.pop('version', None)))
+
+        try:
+            update_orders(updates)
+        except OrderConflict as conflict:
+            conflicting = {order.pk for order in conflict.orders}
+            return Response(
+                [{'version': [OrderConflictError.default_detail]} if pk in conflicting else {} for pk in ids],
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        orders = [serializer.instance for serializer in serializers]
+        return Response(OrderSerializer(orders, many=True).data)
+
+
+class ScheduleViewSet(viewsets.ViewSet):
+    """API-ендпоинт для поиска свободного времени работников"""
+    permission_classes = (IsAdministrator,)
+
+    @action(detail=False, methods=['get'], url_path='free-slots')
+    def free_slots(self, request):
+        """
+        Возвращает свободные интервалы работников в окне [start, end),
+        в которые помещается выбранная услуга.
+        """
+        params = FreeSlotsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        service = params.validated_data['service']
+        start = params.validated_data['start']
+        end = params.validated_data['end']
+
+        if 'employee' in params.validated_data:
+            employees = [params.validated_data['employee']]
+        elif EMPLOYEE in get_group_ids():
+            employees = list(
+                CustomUser.objects
+                .filter(groups=get_group_ids()[EMPLOYEE])
+                .order_by('last_name', 'first_name', 'id')
+            )
+        else:
+            employees = []
+
+        duration = timedelta(minutes=service.duration)
+        indexes = build_interval_indexes([employee.pk for employee in employees], start, end)
+        results = [
+            {
+                'employee': employee,
+                'slots': [
+                    {'start': slot_start, 'end': slot_end}
+                    for slot_start, slot_end in indexes[employee.pk].free_slots(start, end, duration)
+                ],
+            }
+            for employee in employees
+        ]
+
+        return Response({
+            'service': service.pk,
+            'duration': service.duration,
+            'results': EmployeeFreeSlotsSerializer(results, many=True).data,
+        })
+
+
+class ReportViewSet(viewsets.ViewSet):
+    """API-ендпоинт для отчетов по заказам"""
+    permission_classes = (IsAdministrator,)
+
+    @action(detail=False, methods=['get'], url_path='revenue')
+    def revenue(self, request):
+        """
+        Возвращает количество заказов и выручку за период,
+        сгруппированные по выбранным полям. Читает только сводку.
+        """
+        params = RevenueReportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        group_by = [
+            field for field in RevenueReportQuerySerializer.GROUP_FIELDS
+            if field in params.validated_data['group_by']
+        ]
+
+        queryset = OrderRollup.objects.filter(
+            day__range=(params.validated_data['date_from'], params.validated_data['date_to']),
+        )
+        if 'status' in params.validated_data:
+            queryset = queryset.filter(status=params.validated_data['status'])
+
+        values = []
+        for field in group_by:
+            values.append(field)
+            if field in ('service_category', 'service'):
+                values.append(f'{field}__name')
+
+        rows = (
+            queryset
+            .values(*values)
+            .annotate(total_orders=Sum('order_count'), total_revenue=Sum('revenue'))
+            .filter(total_orders__gt=0)
+            .order_by(*group_by)
+        )
+
+        results = []
+        total_orders = total_revenue = 0
+        for row in rows:
+            total_orders += row['total_orders']
+            total_revenue += row['total_revenue']
+            results.append({
+                **{field.replace('__', '_'): row[field] for field in values},
+                'order_count': row['total_orders'],
+                'revenue': row['total_revenue'],
+            })
+
+        return Response({
+            'date_from': params.validated_data['date_from'],
+            'date_to': params.validated_data['date_to'],
+            'order_count': total_orders,
+            'revenue': total_revenue,
+            'results': results,
+        })
+
+
+class SlowQueryViewSet(viewsets.ViewSet):
+    """
+    API-ендпоинт для просмотра медленных запросов к базе с планами выполнения.
+    Возвращает записи процесса, обработавшего запрос, начиная с последней.
+    """
+    permission_classes = (IsAdministrator,)
+
+    def list(self, request):
+        return Response(get_slow_queries())
+
+
+class MeViewSet(viewsets.ViewSet):
+    """API-ендпоинт для данных текущего пользователя"""
+    permission_classes = (IsAuthenticated,)
+
+    @action(detail=False, methods=['get'], url_path='dashboard')
+    def dashboard(self, request):
+        """
+        Возвращает сводку клиента для главного экрана: машины, активные
+        и последние завершенные заказы и итоги. Строится четырьмя запросами
+        и кэшируется до изменения заказов или машин клиента.
+        """
+        user = request.user
+        data, state = dashboard.get_cached(user.pk, request.get_host())
+        if data is None:
+            data = self.get_dashboard(user)
+            dashboard.set_cached(user.pk, state, data)
+        return Response(data)
+
+    def get_dashboard(self, user) -> dict:
+        limit = settings.DASHBOARD_ORDERS_LIMIT
+        context = {'request': self.request}
+        customer_cars = CustomerCar.objects.filter(customer_id=user.pk)
+        orders = Order.objects.filter(customer_car__in=customer_cars.values('id'))
+        order_relations = ('service__service_category', 'employee')
+
+        active_orders = (
+            orders.filter(status=Order.IN_PROGRESS)
+            .select_related(*order_relations)
+            .order_by('start_date', 'id')[:limit]
+        )
+        recent_orders = (
+            orders.filter(status=Order.COMPLETED)
+            .select_related(*order_relations)
+            .order_by('-start_date', '-id')[:limit]
+        )
+        totals = orders.aggregate(
+            orders=Count('id'),
+            active_orders=Count('id', filter=Q(status=Order.IN_PROGRESS)),
+            completed_orders=Count('id', filter=Q(status=Order.COMPLETED)),
+            spent=Sum('service__price', filter=Q(status=Order.COMPLETED), default=0),
+        )
+
+        return {
+            'cars': DashboardCarSerializer(
+                customer_cars.select_related('car__brand').order_by('id'), many=True, context=context,
+            ).data,
+            'active_orders': DashboardOrderSerializer(active_orders, many=True, context=context).data,
+            'recent_orders': DashboardOrderSerializer(recent_orders, many=True, context=context).data,
+            'totals': totals,
+        }
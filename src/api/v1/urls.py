@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from .main import views
+from .main.async_views import make_async_urlpatterns
 
 
 router = DefaultRouter()
@@ -13,7 +15,19 @@ router.register(r'roles', views.GroupViewSet, basename='role')
 router.register(r'users', views.CustomUserViewSet, basename='user')
 router.register(r'customer_cars', views.CustomerCarViewSet, basename='customer_car')
 router.register(r'orders', views.OrderViewSet, basename='order')
+router.register(r'schedule', views.ScheduleViewSet, basename='schedule')
+router.register(r'reports', views.ReportViewSet, basename='report')
+router.register(r'slow_queries', views.SlowQueryViewSet, basename='slow_query')
+router.register(r'me', views.MeViewSet, basename='me')
+
+# Наборы, чтение которых обрабатывается асинхронно при ASYNC_READ_VIEWS
+ASYNC_VIEWSETS = (
+    views.BrandViewSet, views.CarViewSet, views.ServiceCategoryViewSet, views.ServiceViewSet,
+    views.GroupViewSet, views.CustomerCarViewSet, views.OrderViewSet,
+)
 
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(
+        make_async_urlpatterns(router.urls, ASYNC_VIEWSETS) if settings.ASYNC_READ_VIEWS else router.urls
+    )),
 ]
@@ -0,0 +1,46 @@
+import time
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+
+from .models import Brand, Car, Service, ServiceCategory
+
+
+# Справочники, ответы по которым кэшируются до их изменения
+CATALOG_MODELS = (Brand, Car, ServiceCategory, Service, Group)
+
+VERSION_CACHE_KEY = 'catalog:version:{label}'
+
+
+def _get_key(model) -> str:
+    return VERSION_CACHE_KEY.format(label=model._meta.label_lower)
+
+
+def get_versions(models) -> list:
+    """
+    Возвращает версии справочников — время их последнего изменения.
+    Отсутствующая версия создается текущим временем.
+    """
+    keys = [_get_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(models) -> list:
+    """Асинхронный вариант get_versions."""
+    keys = [_get_key(model) for model in models]
+    versions = await cache.aget_many(keys)
+    missing = {key: time.time() for key in keys if key not in versions}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_version(model):
+    """Отмечает изменение справочника, сбрасывая закэшированные ответы по нему."""
+    cache.set(_get_key(model), time.time(), timeout=None)
@@ -0,0 +1,98 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .catalog import get_versions
+from .models import Brand, Car, CustomerCar, Order, Service, ServiceCategory
+
+
+# Справочники, названия из которых входят в сводку клиента
+DASHBOARD_CATALOG_MODELS = (Brand, Car, ServiceCategory, Service)
+
+DATA_CACHE_KEY = 'dashboard:data:{user_id}'
+VERSION_CACHE_KEY = 'dashboard:version:{user_id}'
+
+
+def get_cached(user_id, host) -> tuple:
+    """
+    Возвращает закэшированную сводку клиента (или None) и ее состояние:
+    хост (в сводке абсолютные ссылки на фото), версию данных клиента
+    и версии справочников. Состояние читается до построения сводки
+    и передается в set_cached, поэтому сводка, построенная одновременно
+    с изменением заказов, не будет отдана из кэша.
+    """
+    data_key = DATA_CACHE_KEY.format(user_id=user_id)
+    version_key = VERSION_CACHE_KEY.format(user_id=user_id)
+    values = cache.get_many([data_key, version_key])
+    version = values.get(version_key)
+    if version is None:
+        version = cache.get_or_set(version_key, time.time_ns, timeout=None)
+
+    state = (host, version, get_versions(DASHBOARD_CATALOG_MODELS))
+    cached = values.get(data_key)
+    if cached is None or cached[0] != state:
+        return None, state
+    return cached[1], state
+
+
+def set_cached(user_id, state, data):
+    cache.set(DATA_CACHE_KEY.format(user_id=user_id), (state, data), timeout=settings.DASHBOARD_CACHE_TIMEOUT)
+
+
+def invalidate_customers(customer_ids):
+    """
+    Сбрасывает сводки клиентов после фиксации транзакции: иначе параллельный
+    запрос может успеть закэшировать данные, которые еще не изменились.
+    """
+    customer_ids = {customer_id for customer_id in customer_ids if customer_id is not None}
+    if not customer_ids:
+        return
+
+    def invalidate():
+        cache.set_many({
+            VERSION_CACHE_KEY.format(user_id=customer_id): time.time_ns()
+            for customer_id in customer_ids
+        }, timeout=None)
+        cache.delete_many([DATA_CACHE_KEY.format(user_id=customer_id) for customer_id in customer_ids])
+
+    transaction.on_commit(invalidate)
+
+
+def get_customer_ids(orders) -> set:
+    """
+    Возвращает клиентов заказов, включая прежних при смене машины клиента.
+    Загруженные машины клиента берутся из объектов, остальные — одним запросом.
+    """
+    customer_ids = set()
+    customer_car_ids = set()
+    for order in orders:
+        loaded = getattr(order, '_loaded_values', {}).get('customer_car_id')
+        if loaded is not None and loaded != order.customer_car_id:
+            customer_car_ids.add(loaded)
+        if Order.customer_car.is_cached(order):
+            customer_ids.add(order.customer_car.customer_id)
+        else:
+            customer_car_ids.add(order.customer_car_id)
+
+    if customer_car_ids:
+        customer_ids.update(
+            CustomerCar.objects.filter(pk__in=customer_car_ids).values_list('customer_id', flat=True)
+        )
+    return customer_ids
+
+
+def invalidate_orders(orders):
+    """
+    Сбрасывает сводки клиентов, чьи заказы созданы, изменены или удалены.
+    Текущая машина клиента запоминается как загруженная, чтобы следующее
+    сохранение заказа не сбрасывало сводку прежнего клиента повторно.
+    """
+    if not orders:
+        return
+    invalidate_customers(get_customer_ids(orders))
+    for order in orders:
+        loaded = getattr(order, '_loaded_values', None)
+        if loaded is not None:
+            loaded['customer_car_id'] = order.customer_car_id
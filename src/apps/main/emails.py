@@ -0,0 +1,29 @@
+from apps.notifications.services import build_email, enqueue_emails
+
+
+def build_order_completed_email(order):
+    """
+    Создает письмо клиенту о завершении заказа
+    или возвращает None, если клиент отказался от писем.
+    """
+    customer = order.customer_car.customer
+    if not customer.is_send_notify:
+        return None
+
+    return build_email(
+        subject=f'Статус вашего заказа №{order.pk} изменен',
+        message='Ваш заказ выполнен.',
+        from_email='mufasa133@yandex.ru',
+        recipient_list=[customer.email],
+    )
+
+
+def notify_orders_completed(orders) -> list:
+    """Ставит в очередь письма клиентам о завершении заказов."""
+    emails = [build_order_completed_email(order) for order in orders]
+    return enqueue_emails([email for email in emails if email is not None])
+
+
+def notify_order_completed(order) -> list:
+    """Ставит в очередь письмо клиенту о завершении заказа."""
+    return notify_orders_completed([order])
@@ -0,0 +1,141 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .models import CustomerCar
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'cars/variants'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_variant_names(car_id, image_name) -> tuple:
+    """
+    Возвращает имена файлов миниатюры и WebP-копии для исходного фото.
+    Копии лежат в каталоге машины клиента и названы по хэшу полного имени
+    фото, поэтому копии разных машин и разных фото не совпадают по имени.
+    """
+    digest = hashlib.sha1(image_name.encode()).hexdigest()[:16]
+    return f'{VARIANTS_DIR}/{car_id}/{digest}_thumb.jpg', f'{VARIANTS_DIR}/{car_id}/{digest}.webp'
+
+
+def has_actual_variants(car) -> bool:
+    """Проверяет, что копии фото машины созданы для текущего фото."""
+    if not car.image:
+        return not car.image_thumbnail and not car.image_webp
+    return (car.image_thumbnail.name, car.image_webp.name) == get_variant_names(car.pk, car.image.name)
+
+
+def render_variants(file) -> tuple:
+    """
+    Создает из фото миниатюру в JPEG и копию в WebP,
+    уменьшенные до размеров из настроек с сохранением пропорций.
+    """
+    with Image.open(file) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    thumbnail = image.convert('RGB')
+    thumbnail.thumbnail(settings.CAR_IMAGE_THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+    thumbnail_buffer = BytesIO()
+    thumbnail.save(thumbnail_buffer, 'JPEG', quality=85, optimize=True, progressive=True)
+
+    webp = image.copy()
+    webp.thumbnail(settings.CAR_IMAGE_WEBP_SIZE, Image.Resampling.LANCZOS)
+    webp_buffer = BytesIO()
+    webp.save(webp_buffer, 'WEBP', quality=settings.CAR_IMAGE_WEBP_QUALITY, method=4)
+
+    return thumbnail_buffer.getvalue(), webp_buffer.getvalue()
+
+
+def generate_variants(car_id) -> bool:
+    """
+    Создает копии фото машины клиента и сохраняет ссылки на них.
+    Копии прежнего фото удаляются. Если фото успели заменить,
+    ссылки не перезаписываются. Возвращает True, если копии созданы.
+    """
+    car = CustomerCar.objects.filter(pk=car_id).only('image', 'image_thumbnail', 'image_webp').first()
+    if car is None or has_actual_variants(car):
+        return False
+
+    old_names = [file.name for file in (car.image_thumbnail, car.image_webp) if file]
+    if not car.image:
+        if CustomerCar.objects.filter(pk=car_id, image='').update(image_thumbnail='', image_webp=''):
+            delete_files(car.image_thumbnail.storage, old_names)
+        return False
+
+    image_name = car.image.name
+    storage = car.image.storage
+    with storage.open(image_name) as file:
+        contents = render_variants(file)
+
+    names = []
+    for name, content in zip(get_variant_names(car_id, image_name), contents):
+        # Файл с таким именем может остаться только от этой же машины и этого же фото
+        if storage.exists(name):
+            storage.delete(name)
+        names.append(storage.save(name, ContentFile(content)))
+
+    updated = CustomerCar.objects.filter(pk=car_id, image=image_name).update(
+        image_thumbnail=names[0],
+        image_webp=names[1],
+    )
+    if not updated:
+        # Фото заменили во время обработки: копии для него уже не нужны
+        delete_files(storage, names)
+        return False
+
+    # Удаляются только копии, записанные в базе для этой машины
+    delete_files(storage, [name for name in old_names if name not in names])
+    return True
+
+
+def delete_files(storage, names):
+    """Удаляет файлы, на которые больше не ссылается база."""
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.warning('Не удалось удалить файл %s', name, exc_info=True)
+
+
+def _generate_in_background(car_id):
+    close_old_connections()
+    try:
+        generate_variants(car_id)
+    except Exception:
+        logger.exception('Не удалось создать копии фото машины клиента %s', car_id)
+    finally:
+        close_old_connections()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.CAR_IMAGE_VARIANTS_WORKERS,
+                thread_name_prefix='car-image-variants',
+            )
+    return _executor
+
+
+def schedule_variants(car_id):
+    """
+    Ставит создание копий фото в очередь после коммита транзакции,
+    чтобы обработка не задерживала ответ на запрос.
+    """
+    if settings.CAR_IMAGE_VARIANTS_ASYNC:
+        transaction.on_commit(lambda: get_executor().submit(_generate_in_background, car_id))
+    else:
+        transaction.on_commit(lambda: _generate_in_background(car_id))
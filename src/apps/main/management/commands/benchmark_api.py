@@ -0,0 +1,180 @@
+import json
+import logging
+import statistics
+import subprocess
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.v1.urls import router
+from apps.main.models import Order, Service
+from apps.users.models import CustomUser
+from apps.users.roles import ADMINISTRATOR, CUSTOMER, EMPLOYEE
+
+
+def percentile(values, percent) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку (p50/p95) и количество запросов к базе '
+        'для всех маршрутов api/v1 под каждой ролью и сохраняет результат в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20,
+                            help='Количество замеров каждого маршрута')
+        parser.add_argument('--output', default='bench_output.json',
+                            help='Файл для результатов')
+        parser.add_argument('--compare', default=None,
+                            help='Файл с предыдущими результатами для сравнения')
+
+    def get_extra_params(self):
+        """Параметры для маршрутов, которые без них не работают."""
+        now = timezone.now()
+        service = Service.objects.order_by('pk').first()
+        return {
+            'schedule-free-slots': {
+                'service': service.pk if service else '',
+                'start': now.isoformat(),
+                'end': (now + timedelta(days=1)).isoformat(),
+            },
+            'report-revenue': {
+                'date_from': (now - timedelta(days=365)).date().isoformat(),
+                'date_to': now.date().isoformat(),
+            },
+        }
+
+    def get_routes(self):
+        """Возвращает (название, адрес, параметры) для всех GET-маршрутов роутера."""
+        extra_params = self.get_extra_params()
+        routes = []
+        for prefix, viewset, basename in router.registry:
+            if hasattr(viewset, 'list'):
+                routes.append((f'{basename}-list', reverse(f'{basename}-list'), {}))
+            if hasattr(viewset, 'retrieve'):
+                instance = viewset.queryset.order_by('pk').first() if viewset.queryset is not None else None
+                if instance is not None:
+                    routes.append((f'{basename}-detail', reverse(f'{basename}-detail', args=(instance.pk,)), {}))
+            for extra_action in viewset.get_extra_actions():
+                if 'get' not in extra_action.mapping or extra_action.detail:
+                    continue
+                name = f'{basename}-{extra_action.url_name}'
+                try:
+                    url = reverse(name)
+                except NoReverseMatch:
+                    continue
+                routes.append((name, url, extra_params.get(name, {})))
+        return routes
+
+    def get_clients(self):
+        # Работник и клиент первого заказа, чтобы карточка заказа была им доступна
+        order = Order.objects.select_related('customer_car').order_by('pk').first()
+        preferred = {
+            EMPLOYEE: order.employee_id,
+            CUSTOMER: order.customer_car.customer_id,
+        } if order else {}
+
+        clients = {}
+        for role in (ADMINISTRATOR, EMPLOYEE, CUSTOMER):
+            users = CustomUser.objects.filter(groups__name=role).order_by('pk')
+            user = users.filter(pk=preferred.get(role)).first() or users.first()
+            if user is None:
+                raise CommandError(f'Нет пользователя с ролью {role}. Сначала выполните generate_synthetic_data.')
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+            clients[role] = client
+        return clients
+
+    def measure(self, client, url, params, iterations) -> dict:
+        client.get(url, params)  # прогрев кэшей
+        timings = []
+        queries = []
+        status = None
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url, params)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            status = response.status_code
+        return {
+            'status': status,
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': max(queries),
+        }
+
+    def get_commit(self):
+        try:
+            return subprocess.run(
+                ('git', 'rev-parse', 'HEAD'), cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def handle(self, *args, **options):
+        # Ответы 4xx ожидаемы для ролей без доступа, не засоряем ими вывод
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        previous = self.load(options['compare']) if options['compare'] else None
+
+        clients = self.get_clients()
+        results = []
+        for name, url, params in self.get_routes():
+            for role, client in clients.items():
+                result = {'route': name, 'url': url, 'role': role,
+                          **self.measure(client, url, params, options['iterations'])}
+                results.append(result)
+                self.stdout.write(
+                    f"{name:32} {role:14} {result['status']} "
+                    f"p50={result['p50_ms']:8.2f} мс p95={result['p95_ms']:8.2f} мс "
+                    f"запросов={result['queries']}"
+                )
+
+        report = {
+            'commit': self.get_commit(),
+            'created_at': timezone.now().isoformat(),
+            'iterations': options['iterations'],
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Результаты сохранены в {options["output"]}'))
+
+        if previous is not None:
+            self.compare(previous, results)
+
+    def load(self, path) -> dict:
+        with open(path, encoding='utf-8') as file:
+            return {
+                (result['route'], result['role']): result
+                for result in json.load(file)['results']
+            }
+
+    def compare(self, previous, results):
+        self.stdout.write('\nСравнение с предыдущими результатами:')
+        for result in results:
+            old = previous.get((result['route'], result['role']))
+            if old is None:
+                continue
+            change = (result['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0
+            style = self.style.ERROR if change > 10 or result['queries'] > old['queries'] else self.style.SUCCESS
+            self.stdout.write(style(
+                f"{result['route']:32} {result['role']:14} "
+                f"p50 {old['p50_ms']:.2f} -> {result['p50_ms']:.2f} мс ({change:+.1f}%), "
+                f"запросов {old['queries']} -> {result['queries']}"
+            ))
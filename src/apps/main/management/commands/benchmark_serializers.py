@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from api.v1.main.compiled import compile_serializer
+from api.v1.main.optimizers import optimize_queryset
+from api.v1.main.serializers import (
+    CarGetSerializer, CustomerCarGetSerializer, CustomUserGetSerializer,
+    OrderGetSerializer, ServiceGetSerializer,
+)
+
+SERIALIZERS = (
+    OrderGetSerializer, CustomerCarGetSerializer, CustomUserGetSerializer,
+    ServiceGetSerializer, CarGetSerializer,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость сериализаторов DRF и скомпилированных сериализаторов '
+        '(строк в секунду, включая запросы к базе) и проверяет, что JSON совпадает побайтно'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Количество строк')
+        parser.add_argument('--repeat', type=int, default=5, help='Количество замеров, берется лучший')
+
+    def measure(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            content = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, content
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/')
+        renderer = JSONRenderer()
+        rows = options['rows']
+
+        for serializer_class in SERIALIZERS:
+            compiled = compile_serializer(serializer_class)
+            if compiled is None:
+                self.stdout.write(f'{serializer_class.__name__}: не компилируется')
+                continue
+
+            queryset = serializer_class.Meta.model._default_manager.order_by('pk')
+
+            def render_drf():
+                instances = optimize_queryset(queryset, serializer_class)[:rows]
+                return renderer.render(serializer_class(instances, many=True, context={'request': request}).data)
+
+            def render_compiled():
+                return renderer.render(compiled.serialize(queryset.values(*compiled.columns)[:rows], request))
+
+            drf_time, drf_content = self.measure(render_drf, options['repeat'])
+            compiled_time, compiled_content = self.measure(render_compiled, options['repeat'])
+            count = min(rows, queryset.count())
+            identical = drf_content == compiled_content
+
+            style = self.style.SUCCESS if identical else self.style.ERROR
+            self.stdout.write(style(
+                f'{serializer_class.__name__:28} строк {count:6} '
+                f'DRF {count / drf_time:10.0f} стр/с, скомпилированный {count / compiled_time:10.0f} стр/с '
+                f'(x{drf_time / compiled_time:.1f}), JSON совпадает: {identical}'
+            ))
@@ -0,0 +1,156 @@
+import copy
+import multiprocessing
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+
+from apps.main.models import CustomerCar, Order, Service
+from apps.main.transactions import is_lock_error, retry_on_lock
+from apps.users.models import CustomUser
+from apps.users.roles import ADMINISTRATOR, EMPLOYEE
+
+from .benchmark_api import percentile
+
+# Настройки SQLite по умолчанию в Django: журнал отката и отложенные транзакции
+LEGACY_OPTIONS = {
+    'transaction_mode': 'DEFERRED',
+    'pragmas': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+    },
+}
+
+
+def run_worker(options, ids, duration, write_ratio, use_retry, seed, results):
+    """Выполняет смешанную нагрузку в отдельном процессе и отправляет замеры в очередь."""
+    connection = connections['default']
+    connection.settings_dict['OPTIONS'] = options
+    rng = random.Random(seed)
+
+    def write():
+        start_date = timezone.now() + timedelta(days=3650 + rng.randint(0, 3650), minutes=rng.randint(0, 1440))
+        order = Order.objects.create(
+            service_id=rng.choice(ids['services']),
+            customer_car_id=rng.choice(ids['customer_cars']),
+            employee_id=rng.choice(ids['employees']),
+            administrator_id=rng.choice(ids['administrators']),
+            start_date=start_date,
+            end_date=start_date + timedelta(minutes=30),
+        )
+        order.delete()
+
+    if use_retry:
+        write = retry_on_lock(write)
+    else:
+        write = transaction.atomic()(write)
+
+    stats = {'reads': [], 'writes': [], 'errors': 0}
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        is_write = rng.random() < write_ratio
+        started = time.perf_counter()
+        try:
+            if is_write:
+                write()
+            else:
+                list(Order.objects.select_related('service').order_by('-start_date', '-id')[:20])
+        except OperationalError as error:
+            if not is_lock_error(error):
+                raise
+            stats['errors'] += 1
+            continue
+        stats['writes' if is_write else 'reads'].append((time.perf_counter() - started) * 1000)
+
+    connection.close()
+    results.put(stats)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite при смешанной нагрузке чтения и записи '
+        'из нескольких процессов: настройки Django по умолчанию и настройки проекта'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Количество процессов')
+        parser.add_argument('--duration', type=float, default=10, help='Длительность замера, с')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Доля операций записи')
+
+    def get_ids(self) -> dict:
+        ids = {
+            'services': list(Service.objects.values_list('pk', flat=True)[:100]),
+            'customer_cars': list(CustomerCar.objects.values_list('pk', flat=True)[:100]),
+            'employees': list(CustomUser.objects.filter(groups__name=EMPLOYEE).values_list('pk', flat=True)[:100]),
+            'administrators': list(
+                CustomUser.objects.filter(groups__name=ADMINISTRATOR).values_list('pk', flat=True)[:100]
+            ),
+        }
+        if not all(ids.values()):
+            raise CommandError('Недостаточно данных. Сначала выполните generate_synthetic_data.')
+        return ids
+
+    def run_profile(self, name, options, use_retry, ids, params) -> dict:
+        connection = connections['default']
+        connection.close()
+        connection.settings_dict['OPTIONS'] = options
+        # Режим журнала хранится в файле базы: переключаем его до запуска процессов
+        connection.ensure_connection()
+        connection.close()
+
+        worker_options = copy.deepcopy(options)
+        worker_options['pragmas'].pop('journal_mode', None)
+
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [
+            context.Process(target=run_worker, args=(
+                worker_options, ids, params['duration'], params['write_ratio'], use_retry, seed, results,
+            ))
+            for seed in range(params['workers'])
+        ]
+        for process in processes:
+            process.start()
+        stats = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        reads = [value for item in stats for value in item['reads']]
+        writes = [value for item in stats for value in item['writes']]
+        return {
+            'profile': name,
+            'ops_per_second': round((len(reads) + len(writes)) / params['duration'], 1),
+            'reads': len(reads),
+            'writes': len(writes),
+            'errors': sum(item['errors'] for item in stats),
+            'read_p95_ms': round(percentile(reads, 95), 2) if reads else None,
+            'write_p50_ms': round(statistics.median(writes), 2) if writes else None,
+            'write_p95_ms': round(percentile(writes, 95), 2) if writes else None,
+        }
+
+    def handle(self, *args, **options):
+        ids = self.get_ids()
+        configured = copy.deepcopy(connections['default'].settings_dict['OPTIONS'])
+        profiles = (
+            ('legacy', copy.deepcopy(LEGACY_OPTIONS), False),
+            ('tuned', copy.deepcopy(configured), True),
+        )
+        try:
+            for name, profile_options, use_retry in profiles:
+                result = self.run_profile(name, profile_options, use_retry, ids, options)
+                self.stdout.write(
+                    f"{result['profile']:8} {result['ops_per_second']:8.1f} оп/с "
+                    f"чтений {result['reads']:6} записей {result['writes']:6} ошибок {result['errors']:4} "
+                    f"чтение p95={result['read_p95_ms']} мс "
+                    f"запись p50={result['write_p50_ms']} мс p95={result['write_p95_ms']} мс"
+                )
+        finally:
+            connection = connections['default']
+            connection.close()
+            connection.settings_dict['OPTIONS'] = configured
+            connection.ensure_connection()
@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.http import QueryDict
+
+from api.v1.main.filters import CustomerCarFilter, OrderFilter
+from api.v1.main.pagination import CustomerCarCursorPagination, OrderCursorPagination
+from apps.main.models import CustomerCar, Order
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит план выполнения (EXPLAIN QUERY PLAN) и время запросов '
+        'для основных сочетаний фильтров заказов и машин клиентов'
+    )
+
+    # Сортировка такая же, как при постраничном выводе в API
+    orderings = {
+        Order: OrderCursorPagination.ordering,
+        CustomerCar: CustomerCarCursorPagination.ordering,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Количество повторов каждого запроса для замера времени')
+
+    def get_cases(self, order, car):
+        day = order.start_date.date().isoformat()
+        start = order.start_date.strftime('%Y-%m-%d %H:%M:%S')
+        end = order.end_date.strftime('%Y-%m-%d %H:%M:%S')
+        user_scope = Q(employee=order.employee_id) | Q(
+            customer_car__in=CustomerCar.objects.filter(customer=car.customer_id).values('id'),
+        )
+
+        return (
+            ('status', Order, OrderFilter, f'status={order.status}', None),
+            ('status + start_date__date', Order, OrderFilter,
+             f'status={order.status}&start_date__date={day}', None),
+            ('start_date__range', Order, OrderFilter, f'start_date__range={start},{end}', None),
+            ('employee', Order, OrderFilter, f'employee={order.employee_id}', None),
+            ('employee + start_date__date', Order, OrderFilter,
+             f'employee={order.employee_id}&start_date__date={day}', None),
+            ('customer_car', Order, OrderFilter, f'customer_car={order.customer_car_id}', None),
+            ('non-admin scope', Order, OrderFilter, '', user_scope),
+            ('number__iexact', CustomerCar, CustomerCarFilter, f'number__iexact={car.number}', None),
+            ('number__istartswith', CustomerCar, CustomerCarFilter,
+             f'number__istartswith={car.number[:3]}', None),
+        )
+
+    def handle(self, *args, **options):
+        order = Order.objects.select_related('customer_car').order_by('-id').first()
+        if order is None:
+            raise CommandError('Нет заказов для проверки. Сначала заполните базу данными.')
+        car = order.customer_car
+
+        self.stdout.write(f'Заказов: {Order.objects.count()}, машин клиентов: {CustomerCar.objects.count()}')
+
+        for name, model, filterset_class, params, scope in self.get_cases(order, car):
+            queryset = model.objects.order_by(*self.orderings[model])
+            if scope is not None:
+                queryset = queryset.filter(scope)
+            filterset = filterset_class(QueryDict(params), queryset=queryset)
+            if not filterset.is_valid():
+                raise CommandError(f'{name}: {filterset.errors}')
+            queryset = filterset.qs
+
+            plan = queryset.explain()
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                list(queryset[:20])
+            elapsed = (time.perf_counter() - started) / options['repeat'] * 1000
+
+            full_scan = f'SCAN {model._meta.db_table}' in plan
+            style = self.style.ERROR if full_scan else self.style.SUCCESS
+            self.stdout.write(style(f'\n{name}: {elapsed:.2f} мс, полный просмотр таблицы: {full_scan}'))
+            self.stdout.write(plan)
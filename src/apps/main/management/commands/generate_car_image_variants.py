@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from apps.main.images import generate_variants, has_actual_variants
+from apps.main.models import CustomerCar
+
+
+class Command(BaseCommand):
+    help = 'Создает миниатюры и WebP-копии для уже загруженных фото машин клиентов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Количество машин, читаемых из базы за раз')
+
+    def handle(self, *args, **options):
+        cars = (
+            CustomerCar.objects
+            .exclude(image='')
+            .only('image', 'image_thumbnail', 'image_webp')
+            .order_by('pk')
+            .iterator(chunk_size=options['chunk_size'])
+        )
+        created = failed = 0
+        for car in cars:
+            if has_actual_variants(car):
+                continue
+            try:
+                created += generate_variants(car.pk)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f'Машина {car.pk}: {error}')
+        self.stdout.write(self.style.SUCCESS(f'Созданы копии фото: {created}, ошибок: {failed}'))
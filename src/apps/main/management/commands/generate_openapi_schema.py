@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from config.schema import CODECS, get_code_version, write_schema_files
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует схему OpenAPI для текущей версии кода (выполняется при сборке). '
+        'Файлы схемы других версий удаляются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', action='append', choices=tuple(CODECS), dest='formats',
+            help='Формат схемы, можно указать несколько раз. По умолчанию все форматы',
+        )
+
+    def handle(self, *args, **options):
+        version = get_code_version()
+        paths = write_schema_files(version, options['formats'] or tuple(CODECS))
+
+        for path in settings.OPENAPI_SCHEMA_DIR.glob('openapi-*'):
+            if path not in paths:
+                path.unlink()
+
+        self.stdout.write(self.style.SUCCESS(f'Схема версии {version}: ' + ', '.join(path.name for path in paths)))
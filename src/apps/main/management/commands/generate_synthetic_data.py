@@ -0,0 +1,186 @@
+import random
+import secrets
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.main import rollups
+from apps.main.models import (
+    Brand, Car, CustomerCar, Order, Service, ServiceCategory,
+)
+from apps.main.plates import normalize_plate
+from apps.users.models import CustomUser
+from apps.users.roles import ADMINISTRATOR, CUSTOMER, EMPLOYEE
+
+
+PLATE_LETTERS = 'АВЕКМНОРСТУХ'
+FIRST_NAMES = ('Иван', 'Петр', 'Анна', 'Мария', 'Сергей', 'Ольга', 'Алексей', 'Елена')
+LAST_NAMES = ('Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов', 'Попов', 'Волков')
+PATRONYMICS = ('Иванович', 'Петрович', 'Сергеевич', 'Алексеевич', '')
+BRANDS = ('Audi', 'BMW', 'Kia', 'Lada', 'Toyota', 'Skoda', 'Hyundai', 'Renault', 'Nissan', 'Ford')
+CATEGORIES = ('Мойка', 'Химчистка', 'Полировка', 'Шиномонтаж', 'Детейлинг')
+DURATIONS = (30, 60, 90, 120)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными: марки, машины, услуги, '
+        'пользователи всех ролей, машины клиентов и заказы. '
+        'Данные вставляются пачками через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1,
+                            help='Множитель для количества всех сущностей')
+        parser.add_argument('--brands', type=int, default=10)
+        parser.add_argument('--cars-per-brand', type=int, default=10)
+        parser.add_argument('--services', type=int, default=30)
+        parser.add_argument('--customers', type=int, default=1000)
+        parser.add_argument('--employees', type=int, default=30)
+        parser.add_argument('--administrators', type=int, default=5)
+        parser.add_argument('--customer-cars', type=int, default=1500)
+        parser.add_argument('--orders', type=int, default=100000)
+        parser.add_argument('--days', type=int, default=365,
+                            help='Период, на который распределяются заказы')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def scaled(self, options, name) -> int:
+        return max(1, int(options[name] * options['scale']))
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        # Метка запуска делает адреса почты уникальными при повторной генерации
+        self.tag = secrets.token_hex(3)
+
+        groups = {
+            name: Group.objects.get_or_create(name=name)[0]
+            for name in (ADMINISTRATOR, EMPLOYEE, CUSTOMER)
+        }
+
+        with transaction.atomic():
+            cars = self.create_cars(self.scaled(options, 'brands'), options['cars_per_brand'])
+            services = self.create_services(self.scaled(options, 'services'))
+            administrators = self.create_users(groups[ADMINISTRATOR], 'admin', self.scaled(options, 'administrators'))
+            employees = self.create_users(groups[EMPLOYEE], 'employee', self.scaled(options, 'employees'))
+            customers = self.create_users(groups[CUSTOMER], 'customer', self.scaled(options, 'customers'))
+            customer_cars = self.create_customer_cars(cars, customers, self.scaled(options, 'customer_cars'))
+
+        orders = self.create_orders(
+            services, customer_cars, employees, administrators,
+            self.scaled(options, 'orders'), options['days'],
+        )
+        rollups.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: машин {len(cars)}, услуг {len(services)}, '
+            f'пользователей {len(administrators) + len(employees) + len(customers)}, '
+            f'машин клиентов {len(customer_cars)}, заказов {orders}'
+        ))
+
+    def create_cars(self, brand_count, cars_per_brand) -> list:
+        brands = Brand.objects.bulk_create(
+            Brand(name=f'{BRANDS[i % len(BRANDS)]} {self.tag}-{i}') for i in range(brand_count)
+        )
+        return Car.objects.bulk_create(
+            (Car(brand=brand, model=f'Model {i}') for brand in brands for i in range(cars_per_brand)),
+            batch_size=self.batch_size,
+        )
+
+    def create_services(self, count) -> list:
+        categories = ServiceCategory.objects.bulk_create(
+            ServiceCategory(name=f'{name} {self.tag}') for name in CATEGORIES
+        )
+        return Service.objects.bulk_create(
+            Service(
+                service_category=self.random.choice(categories),
+                name=f'Услуга {i}',
+                price=self.random.randrange(300, 5000, 50),
+                duration=self.random.choice(DURATIONS),
+            )
+            for i in range(count)
+        )
+
+    def create_users(self, group, prefix, count) -> list:
+        # Хеш пароля вычисляется один раз: это самая дорогая часть создания пользователя
+        password = make_password('password')
+        users = CustomUser.objects.bulk_create(
+            (
+                CustomUser(
+                    email=f'{prefix}{i}.{self.tag}@example.com',
+                    password=password,
+                    first_name=self.random.choice(FIRST_NAMES),
+                    last_name=self.random.choice(LAST_NAMES),
+                    patronymic=self.random.choice(PATRONYMICS),
+                    is_send_notify=self.random.random() < 0.7,
+                )
+                for i in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        CustomUser.groups.through.objects.bulk_create(
+            (CustomUser.groups.through(customuser_id=user.pk, group_id=group.pk) for user in users),
+            batch_size=self.batch_size,
+        )
+        return users
+
+    def make_plate(self) -> str:
+        letters = self.random.choices(PLATE_LETTERS, k=3)
+        digits = self.random.randrange(1, 1000)
+        region = self.random.choice((77, 97, 99, 177, 197, 199, 50, 750))
+        return f'{letters[0]}{digits:03d}{letters[1]}{letters[2]}{region}'
+
+    def create_customer_cars(self, cars, customers, count) -> list:
+        plates = [self.make_plate() for _ in range(count)]
+        # bulk_create не вызывает save(), поэтому номер для поиска заполняется здесь
+        return CustomerCar.objects.bulk_create(
+            (
+                CustomerCar(
+                    car=self.random.choice(cars),
+                    customer=customers[i % len(customers)],
+                    year=self.random.randint(1995, 2023),
+                    number=plate,
+                    number_normalized=normalize_plate(plate),
+                )
+                for i, plate in enumerate(plates)
+            ),
+            batch_size=self.batch_size,
+        )
+
+    def create_orders(self, services, customer_cars, employees, administrators, count, days) -> int:
+        """
+        Создает заказы пачками, не держа их все в памяти.
+        У каждого работника заказы идут друг за другом без пересечений.
+        """
+        now = timezone.now().replace(second=0, microsecond=0)
+        started = now - timedelta(days=days)
+        cursors = {employee.pk: started for employee in employees}
+        step = timedelta(days=days) * len(employees) / count
+
+        created = 0
+        while created < count:
+            batch = []
+            for _ in range(min(self.batch_size, count - created)):
+                employee = self.random.choice(employees)
+                service = self.random.choice(services)
+                start_date = cursors[employee.pk] + step * self.random.uniform(0, 1)
+                end_date = start_date + timedelta(minutes=service.duration)
+                cursors[employee.pk] = end_date
+                batch.append(Order(
+                    service=service,
+                    customer_car=self.random.choice(customer_cars),
+                    employee=employee,
+                    administrator=self.random.choice(administrators),
+                    status=1 if end_date < now else 0,
+                    start_date=start_date,
+                    end_date=end_date,
+                ))
+            Order.objects.bulk_create(batch)
+            created += len(batch)
+            self.stdout.write(f'Заказов: {created}/{count}')
+        return created
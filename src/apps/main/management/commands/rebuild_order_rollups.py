@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.main.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводку по заказам с нуля, обрабатывая заказы частями'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='Количество заказов в одной части')
+
+    def handle(self, *args, **options):
+        count = rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Строк в сводке: {count}'))
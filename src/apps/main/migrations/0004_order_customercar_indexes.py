@@ -0,0 +1,34 @@
+# Generated by Django 4.2.1 on 2026-10-18 18:12
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_alter_brand_options_alter_customercar_customer_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customercar',
+            index=models.Index(django.db.models.functions.text.Upper('number'), name='customercar_number_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['start_date', 'id'], name='order_start_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'start_date'], name='order_status_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['employee', 'start_date'], name='order_employee_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer_car', 'start_date'], name='order_customer_car_start_idx'),
+        ),
+    ]
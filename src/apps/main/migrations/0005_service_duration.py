@@ -0,0 +1,18 @@
+# Generated by Django 4.2.1 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_order_customercar_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='duration',
+            field=models.PositiveIntegerField(default=60, verbose_name='Длительность, мин'),
+        ),
+    ]
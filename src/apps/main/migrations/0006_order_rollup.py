@@ -0,0 +1,34 @@
+# Generated by Django 4.2.1 on 2026-10-18 18:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_service_duration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('status', models.PositiveSmallIntegerField(choices=[(0, 'В работе'), (1, 'Завершен')], verbose_name='Статус')),
+                ('order_count', models.IntegerField(default=0, verbose_name='Количество заказов')),
+                ('revenue', models.BigIntegerField(default=0, verbose_name='Выручка')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main.service', verbose_name='Услуга')),
+                ('service_category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main.servicecategory', verbose_name='Категория услуг')),
+            ],
+            options={
+                'verbose_name': 'Сводка по заказам',
+                'verbose_name_plural': 'Сводки по заказам',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='orderrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'service', 'status'), name='order_rollup_day_service_status_uniq'),
+        ),
+    ]
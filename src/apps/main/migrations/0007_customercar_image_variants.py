@@ -0,0 +1,23 @@
+# Generated by Django 4.2.1 on 2026-10-18 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_order_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customercar',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='cars/variants/', verbose_name='Миниатюра фото'),
+        ),
+        migrations.AddField(
+            model_name='customercar',
+            name='image_webp',
+            field=models.ImageField(blank=True, editable=False, upload_to='cars/variants/', verbose_name='Фото в WebP'),
+        ),
+    ]
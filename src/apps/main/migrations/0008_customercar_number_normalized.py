@@ -0,0 +1,49 @@
+from django.db import migrations, models
+
+# Копия apps.main.plates на момент миграции: миграция не должна меняться
+# вместе с правилами нормализации в коде приложения
+PLATE_LOOKALIKES = str.maketrans('АВЕКМНОРСТУХ', 'ABEKMHOPCTYX')
+PLATE_SEPARATORS = str.maketrans('', '', ' -_.')
+
+
+def normalize_plate(value):
+    value = ''.join(value.split()).upper().translate(PLATE_LOOKALIKES)
+    return value.translate(PLATE_SEPARATORS)
+
+
+def fill_number_normalized(apps, schema_editor):
+    CustomerCar = apps.get_model('main', 'CustomerCar')
+    cars = []
+    for car in CustomerCar.objects.only('id', 'number').iterator(chunk_size=2000):
+        car.number_normalized = normalize_plate(car.number)
+        cars.append(car)
+        if len(cars) >= 2000:
+            CustomerCar.objects.bulk_update(cars, ('number_normalized',))
+            cars = []
+    CustomerCar.objects.bulk_update(cars, ('number_normalized',))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_customercar_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customercar',
+            name='number_normalized',
+            field=models.CharField(default='', editable=False, max_length=20, verbose_name='Номер для поиска'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_number_normalized, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='customercar',
+            name='number_normalized',
+            field=models.CharField(db_index=True, editable=False, max_length=20, verbose_name='Номер для поиска'),
+        ),
+        migrations.RemoveIndex(
+            model_name='customercar',
+            name='customercar_number_upper_idx',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.1 on 2026-10-18 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_order_version'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_employee_start_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['employee', 'start_date', 'end_date'], name='order_employee_period_idx'),
+        ),
+    ]
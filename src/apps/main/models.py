@@ -2,6 +2,7 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 from ..users.models import CustomUser
+from .plates import normalize_plate
 
 
 class Brand(models.Model):
@@ -84,6 +85,7 @@ class Service(models.Model):
         service_category (int): Категория услуги.
         name (str): Название услуги.
         price (int): Цена услуги.
+        duration (int): Длительность услуги в минутах.
     """
 
     service_category = models.ForeignKey(
@@ -100,6 +102,10 @@ class Service(models.Model):
     price = models.PositiveIntegerField(
         verbose_name=_('Цена'),
     )
+    duration = models.PositiveIntegerField(
+        verbose_name=_('Длительность, мин'),
+        default=60,
+    )
 
     class Meta:
         verbose_name = _('Услуга')
@@ -118,7 +124,10 @@ class CustomerCar(models.Model):
         customer (int): Клиент, которому принадлежит машина.
         year (int): Год выпуска машины.
         number (str): Номер машины.
+        number_normalized (str): Номер машины для поиска.
         image (str): Фото машины.
+        image_thumbnail (str): Уменьшенная копия фото машины.
+        image_webp (str): Копия фото машины в формате WebP.
     """
 
     car = models.ForeignKey(
@@ -143,11 +152,29 @@ class CustomerCar(models.Model):
         verbose_name=_('Номер'),
         max_length=20,
     )
+    number_normalized = models.CharField(
+        verbose_name=_('Номер для поиска'),
+        max_length=20,
+        editable=False,
+        db_index=True,
+    )
     image = models.ImageField(
         verbose_name=_('Фото'),
         upload_to='cars/',
         blank=True,
     )
+    image_thumbnail = models.ImageField(
+        verbose_name=_('Миниатюра фото'),
+        upload_to='cars/variants/',
+        blank=True,
+        editable=False,
+    )
+    image_webp = models.ImageField(
+        verbose_name=_('Фото в WebP'),
+        upload_to='cars/variants/',
+        blank=True,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = _('Машина клиента')
@@ -156,6 +183,13 @@ class CustomerCar(models.Model):
     def __str__(self) -> str:
         return self.number
 
+    def save(self, *args, **kwargs):
+        self.number_normalized = normalize_plate(self.number)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'number' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'number_normalized'}
+        super().save(*args, **kwargs)
+
 
 class Order(models.Model):
     """
@@ -169,13 +203,23 @@ class Order(models.Model):
         status (int): Статус выполнения заказа.
         start_date (datetime): Дата и время начала выполнения заказа.
         end_date (datetime): Дата и время завершения выполнения заказа.
+        version (int): Номер версии, увеличивается при каждом изменении заказа.
     """
 
+    IN_PROGRESS = 0
+    COMPLETED = 1
+
     STATUSES = (
-        (0, 'В работе'),
-        (1, 'Завершен'),
+        (IN_PROGRESS, 'В работе'),
+        (COMPLETED, 'Завершен'),
     )
 
+    # Допустимые переходы статусов: {текущий статус: статусы, в которые можно перейти}
+    STATUS_TRANSITIONS = {
+        IN_PROGRESS: (COMPLETED,),
+        COMPLETED: (IN_PROGRESS,),
+    }
+
     service = models.ForeignKey(
         verbose_name=_('Услуга'),
         to='Service',
@@ -215,10 +259,95 @@ class Order(models.Model):
     end_date = models.DateTimeField(
         verbose_name=_('Дата и время завершения выполнения'),
     )
+    version = models.PositiveIntegerField(
+        verbose_name=_('Версия'),
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = _('Заказ')
         verbose_name_plural = _('Заказы')
+        indexes = (
+            models.Index(fields=('start_date', 'id'), name='order_start_date_id_idx'),
+            models.Index(fields=('status', 'start_date'), name='order_status_start_date_idx'),
+            # Покрывает поиск пересекающихся заказов работника без чтения строк таблицы
+            models.Index(fields=('employee', 'start_date', 'end_date'), name='order_employee_period_idx'),
+            models.Index(fields=('customer_car', 'start_date'), name='order_customer_car_start_idx'),
+        )
 
     def __str__(self) -> str:
         return f'{self.service.name}: {self.customer_car.car.brand} {self.customer_car.car.model}'
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем загруженные значения, чтобы при сохранении
+        # учесть изменение в сводных данных без дополнительного запроса
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Изменение через save (например, из админки) тоже меняет версию,
+        # чтобы параллельные изменения через API получили конфликт
+        if not self._state.adding:
+            self.version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version'}
+        super().save(*args, **kwargs)
+
+
+class OrderRollup(models.Model):
+    """
+    Модель сводных данных по заказам за день.
+
+    Атрибуты:
+        day (date): День начала выполнения заказов.
+        service_category (int): Категория услуги.
+        service (int): Услуга.
+        status (int): Статус заказов.
+        order_count (int): Количество заказов.
+        revenue (int): Выручка по заказам.
+    """
+
+    day = models.DateField(
+        verbose_name=_('День'),
+    )
+    service_category = models.ForeignKey(
+        verbose_name=_('Категория услуг'),
+        to='ServiceCategory',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    service = models.ForeignKey(
+        verbose_name=_('Услуга'),
+        to='Service',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    status = models.PositiveSmallIntegerField(
+        verbose_name=_('Статус'),
+        choices=Order.STATUSES,
+    )
+    order_count = models.IntegerField(
+        verbose_name=_('Количество заказов'),
+        default=0,
+    )
+    revenue = models.BigIntegerField(
+        verbose_name=_('Выручка'),
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = _('Сводка по заказам')
+        verbose_name_plural = _('Сводки по заказам')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('day', 'service', 'status'),
+                name='order_rollup_day_service_status_uniq',
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.day}: {self.service_id} ({self.status})'
@@ -0,0 +1,96 @@
+from django.db import transaction
+from django.db.models import F
+
+from . import dashboard, rollups
+from .emails import notify_orders_completed
+from .models import Order
+
+
+class OrderConflict(Exception):
+    """
+    Заказы изменены параллельно: версия или статус в базе
+    отличаются от ожидаемых, обновление не применено.
+    """
+
+    def __init__(self, orders):
+        super().__init__(orders)
+        self.orders = orders
+
+
+def get_changes(order, data) -> dict:
+    """Возвращает только те значения из data, которые отличаются от текущих значений заказа."""
+    changes = {}
+    for name, value in data.items():
+        field = Order._meta.get_field(name)
+        current = getattr(order, field.attname)
+        new = value.pk if field.is_relation and value is not None else value
+        if current != new:
+            changes[name] = value
+    return changes
+
+
+def apply_update(order, data, version=None) -> dict:
+    """
+    Изменяет заказ одним условным запросом UPDATE ... WHERE version = <загруженная>,
+    а при смене статуса еще и status = <текущий>. Обновляются только измененные
+    поля и версия. version — версия, которую видел клиент, если он ее передал.
+    Возвращает примененные изменения или вызывает OrderConflict.
+    """
+    if version is not None and version != order.version:
+        raise OrderConflict([order])
+
+    changes = get_changes(order, data)
+    if not changes:
+        return changes
+
+    conditions = {'pk': order.pk, 'version': order.version}
+    if 'status' in changes:
+        conditions['status'] = order.status
+    if not Order.objects.filter(**conditions).update(**changes, version=F('version') + 1):
+        raise OrderConflict([order])
+
+    for name, value in changes.items():
+        setattr(order, name, value)
+    order.version += 1
+    return changes
+
+
+def update_orders(updates) -> list:
+    """
+    Применяет изменения к заказам в одной транзакции: либо все, либо ни одного.
+    updates: тройки (заказ, изменения, версия клиента или None).
+
+    Сводки и письма о завершении обновляются только по примененным изменениям,
+    поэтому при параллельном завершении заказа письмо отправляется один раз.
+    Возвращает заказы, завершенные этим обновлением.
+    """
+    conflicts = []
+    changed = []
+    completed = []
+    with transaction.atomic():
+        for order, data, version in updates:
+            rollups.load_missing_values(order)
+            old_key = rollups.get_loaded_order_key(order)
+            try:
+                changes = apply_update(order, data, version)
+            except OrderConflict:
+                conflicts.append(order)
+                continue
+            if changes:
+                changed.append((old_key, order))
+            if changes.get('status') == Order.COMPLETED:
+                completed.append(order)
+
+        if conflicts:
+            raise OrderConflict(conflicts)
+
+        rollups.record_changed(changed)
+        dashboard.invalidate_orders([order for _, order in changed])
+        if completed:
+            notify_orders_completed(completed)
+    return completed
+
+
+def update_order(order, data, version=None) -> bool:
+    """Изменяет один заказ. Возвращает True, если заказ завершен этим обновлением."""
+    return bool(update_orders([(order, data, version)]))
@@ -0,0 +1,12 @@
+# Кириллические буквы номерного знака и похожие на них латинские
+PLATE_LOOKALIKES = str.maketrans('АВЕКМНОРСТУХ', 'ABEKMHOPCTYX')
+PLATE_SEPARATORS = ' -_.'
+
+
+def normalize_plate(value) -> str:
+    """
+    Приводит номер машины к виду для поиска: верхний регистр,
+    кириллические буквы заменены похожими латинскими, без пробелов и разделителей.
+    """
+    value = ''.join(value.split()).upper().translate(PLATE_LOOKALIKES)
+    return value.translate(str.maketrans('', '', PLATE_SEPARATORS))
@@ -0,0 +1,197 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Order, OrderRollup, Service
+
+# Поля заказа, из которых состоит ключ сводки
+ORDER_KEY_FIELDS = ('start_date', 'service_id', 'status')
+
+
+def get_order_key(order) -> tuple:
+    """Возвращает ключ сводки заказа: (день, услуга, статус)."""
+    return timezone.localdate(order.start_date), order.service_id, order.status
+
+
+def get_loaded_order_key(order):
+    """
+    Возвращает ключ сводки заказа по значениям, загруженным из базы,
+    или None, если заказ еще не сохранялся или загружен без части
+    полей ключа (only/defer).
+    """
+    loaded = getattr(order, '_loaded_values', None)
+    if loaded is None or not all(name in loaded for name in ORDER_KEY_FIELDS):
+        return None
+    return (
+        timezone.localdate(loaded['start_date']),
+        loaded['service_id'],
+        loaded['status'],
+    )
+
+
+def load_missing_values(order, fields=ORDER_KEY_FIELDS):
+    """
+    Дочитывает из базы прежние значения полей, которых нет среди
+    загруженных: заказ получен через only/defer или создан вручную
+    с первичным ключом. Отложенные поля заполняются и в самом заказе.
+    """
+    if order.pk is None:
+        return
+    loaded = getattr(order, '_loaded_values', {})
+    missing = [name for name in fields if name not in loaded]
+    if not missing:
+        return
+    values = Order.objects.filter(pk=order.pk).values(*missing).first()
+    if values is None:
+        return
+
+    deferred = order.get_deferred_fields()
+    for name, value in values.items():
+        if name in deferred:
+            setattr(order, name, value)
+    order._loaded_values = {**loaded, **values}
+
+
+def remember_order_key(order):
+    """
+    Запоминает текущие значения полей ключа сводки как загруженные из базы.
+    Остальные загруженные значения (например, машина клиента для сводки
+    клиента) не затрагиваются.
+    """
+    order._loaded_values = {
+        **getattr(order, '_loaded_values', {}),
+        **{name: getattr(order, name) for name in ORDER_KEY_FIELDS},
+    }
+
+
+def apply_deltas(deltas):
+    """
+    Применяет изменения количества заказов к сводке.
+    deltas: словарь {(день, услуга, статус): изменение количества}.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    services = Service.objects.in_bulk({service_id for _, service_id, _ in deltas})
+
+    with transaction.atomic():
+        for (day, service_id, status), delta in deltas.items():
+            service = services.get(service_id)
+            if service is None:
+                continue
+            updated = OrderRollup.objects.filter(day=day, service_id=service_id, status=status).update(
+                order_count=F('order_count') + delta,
+                revenue=F('revenue') + delta * service.price,
+            )
+            if updated:
+                continue
+            try:
+                with transaction.atomic():
+                    OrderRollup.objects.create(
+                        day=day,
+                        service_category_id=service.service_category_id,
+                        service_id=service_id,
+                        status=status,
+                        order_count=delta,
+                        revenue=delta * service.price,
+                    )
+            except IntegrityError:
+                # Строку сводки успели создать параллельно
+                OrderRollup.objects.filter(day=day, service_id=service_id, status=status).update(
+                    order_count=F('order_count') + delta,
+                    revenue=F('revenue') + delta * service.price,
+                )
+
+
+def reprice_service(service):
+    """
+    Пересчитывает строки сводки услуги по ее текущей цене и категории:
+    выручка в сводке, как и в rebuild, считается по цене услуги,
+    поэтому после изменения цены прежние суммы устаревают.
+    """
+    OrderRollup.objects.filter(service_id=service.pk).update(
+        service_category_id=service.service_category_id,
+        revenue=F('order_count') * service.price,
+    )
+
+
+def record_created(orders):
+    """Учитывает в сводке созданные заказы."""
+    deltas = defaultdict(int)
+    for order in orders:
+        deltas[get_order_key(order)] += 1
+        remember_order_key(order)
+    apply_deltas(deltas)
+
+
+def record_deleted(orders):
+    """Учитывает в сводке удаленные заказы."""
+    deltas = defaultdict(int)
+    for order in orders:
+        deltas[get_loaded_order_key(order) or get_order_key(order)] -= 1
+    apply_deltas(deltas)
+
+
+def record_changed(changes):
+    """
+    Учитывает в сводке измененные заказы.
+    changes: пары (ключ сводки до изменения, заказ после изменения).
+    """
+    deltas = defaultdict(int)
+    for old_key, order in changes:
+        new_key = get_order_key(order)
+        if old_key != new_key:
+            deltas[old_key] -= 1
+            deltas[new_key] += 1
+        remember_order_key(order)
+    apply_deltas(deltas)
+
+
+def rebuild(chunk_size=10000) -> int:
+    """
+    Пересчитывает сводку по всем заказам.
+    Заказы агрегируются в базе частями по диапазонам первичного ключа.
+    Возвращает количество строк сводки.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    last_pk = 0
+
+    while True:
+        bounds = list(
+            Order.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not bounds:
+            break
+        rows = (
+            Order.objects
+            .filter(pk__gt=last_pk, pk__lte=bounds[-1])
+            .annotate(day=TruncDate('start_date'))
+            .values('day', 'service_id', 'service__service_category_id', 'status')
+            .annotate(order_count=Count('id'), revenue=Sum('service__price'))
+            .order_by()
+        )
+        for row in rows:
+            key = (row['day'], row['service__service_category_id'], row['service_id'], row['status'])
+            totals[key][0] += row['order_count']
+            totals[key][1] += row['revenue']
+        last_pk = bounds[-1]
+
+    rollups = [
+        OrderRollup(
+            day=day,
+            service_category_id=service_category_id,
+            service_id=service_id,
+            status=status,
+            order_count=order_count,
+            revenue=revenue,
+        )
+        for (day, service_category_id, service_id, status), (order_count, revenue) in totals.items()
+    ]
+    with transaction.atomic():
+        OrderRollup.objects.all().delete()
+        OrderRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
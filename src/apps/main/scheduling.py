@@ -0,0 +1,138 @@
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.transaction import TransactionManagementError
+
+from apps.users.models import CustomUser
+
+from .models import Order
+
+
+class IntervalIndex:
+    """
+    Отсортированный список непересекающихся занятых интервалов одного работника.
+    Пересекающиеся и смежные интервалы при построении объединяются.
+    """
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def overlaps(self, start, end) -> bool:
+        """Проверяет, пересекается ли интервал [start, end) с занятым временем."""
+        position = bisect_right(self.starts, start) - 1
+        if position >= 0 and self.ends[position] > start:
+            return True
+        return position + 1 < len(self.starts) and self.starts[position + 1] < end
+
+    def add(self, start, end):
+        """Добавляет занятый интервал [start, end), не пересекающийся с уже занятыми."""
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+
+    def free_slots(self, start, end, duration) -> list:
+        """
+        Возвращает свободные интервалы внутри окна [start, end),
+        длина которых не меньше duration.
+        """
+        slots = []
+        cursor = start
+        position = max(bisect_right(self.starts, start) - 1, 0)
+        for busy_start, busy_end in zip(self.starts[position:], self.ends[position:]):
+            if busy_start >= end:
+                break
+            if busy_start - cursor >= duration:
+                slots.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if end - cursor >= duration:
+            slots.append((cursor, end))
+        return slots
+
+
+def build_interval_indexes(employee_ids, start, end, exclude_ids=()) -> dict:
+    """
+    Строит индексы занятости работников в окне [start, end)
+    по результатам одного запроса по диапазону к заказам.
+    Заказы из exclude_ids не учитываются.
+    """
+    intervals = defaultdict(list)
+    orders = (
+        Order.objects
+        .filter(
+            employee_id__in=employee_ids,
+            start_date__gt=start - settings.ORDER_MAX_DURATION,
+            start_date__lt=end,
+            end_date__gt=start,
+        )
+        .exclude(pk__in=exclude_ids)
+        .values_list('employee_id', 'start_date', 'end_date')
+    )
+    for employee_id, order_start, order_end in orders:
+        intervals[employee_id].append((order_start, order_end))
+
+    return {employee_id: IntervalIndex(intervals[employee_id]) for employee_id in employee_ids}
+
+
+def lock_employees(employee_ids):
+    """
+    Блокирует строки работников до конца текущей транзакции, чтобы
+    параллельные записи заказов одного работника проверялись на пересечение
+    по очереди. SQLite не поддерживает SELECT ... FOR UPDATE, но транзакции
+    в нем начинаются с BEGIN IMMEDIATE (SQLITE_TRANSACTION_MODE) и сразу
+    получают блокировку записи базы.
+
+    Вне транзакции блокировка снимается сразу (а в SQLite ее нет совсем),
+    и проверка пересечений ничего не гарантирует, поэтому такой вызов —
+    ошибка. Django сам проверяет это только для баз с SELECT ... FOR UPDATE.
+    """
+    if not connection.in_atomic_block:
+        raise TransactionManagementError('Блокировка работников возможна только внутри транзакции')
+    list(
+        CustomUser.objects
+        .select_for_update()
+        .filter(pk__in=employee_ids)
+        .only('pk')
+        .order_by('pk')
+    )
+
+
+def find_overlaps(bookings, exclude_ids=()) -> list:
+    """
+    Проверяет, пересекаются ли интервалы работников с их заказами
+    и с предыдущими интервалами из bookings.
+    bookings: тройки (работник, начало, конец); exclude_ids: изменяемые заказы,
+    прежнее время которых не учитывается.
+    Выполняет блокировку работников и один запрос по диапазону
+    (employee, start_date, end_date). Возвращает список флагов пересечения.
+    Вызывается внутри транзакции, в которой заказы будут записаны,
+    иначе вызывает TransactionManagementError.
+    """
+    if not bookings:
+        return []
+
+    employee_ids = {employee_id for employee_id, _, _ in bookings}
+    lock_employees(employee_ids)
+    indexes = build_interval_indexes(
+        employee_ids,
+        min(start for _, start, _ in bookings),
+        max(end for _, _, end in bookings),
+        exclude_ids,
+    )
+
+    overlaps = []
+    for employee_id, start, end in bookings:
+        index = indexes[employee_id]
+        overlapping = index.overlaps(start, end)
+        if not overlapping:
+            index.add(start, end)
+        overlaps.append(overlapping)
+    return overlaps
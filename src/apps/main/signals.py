@@ -0,0 +1,69 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import catalog, dashboard, images, rollups
+from .models import CustomerCar, Order, Service
+
+# Поля заказа, прежние значения которых нужны сводкам при сохранении и удалении
+TRACKED_ORDER_FIELDS = (*rollups.ORDER_KEY_FIELDS, 'customer_car_id')
+
+
+@receiver(pre_save, sender=Order)
+@receiver(pre_delete, sender=Order)
+def load_tracked_values(sender, instance, raw=False, **kwargs):
+    """Дочитывает прежние значения полей заказа, не загруженные через only/defer."""
+    if not raw:
+        rollups.load_missing_values(instance, TRACKED_ORDER_FIELDS)
+
+
+@receiver(post_save, sender=Order)
+def update_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    """Учитывает созданный или измененный заказ в сводке и сбрасывает сводку клиента."""
+    if raw:
+        return
+    old_key = None if created else rollups.get_loaded_order_key(instance)
+    if old_key is None:
+        rollups.record_created([instance])
+    else:
+        rollups.record_changed([(old_key, instance)])
+    dashboard.invalidate_orders([instance])
+
+
+@receiver(post_delete, sender=Order)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    """Исключает удаленный заказ из сводки и сбрасывает сводку клиента."""
+    rollups.record_deleted([instance])
+    dashboard.invalidate_orders([instance])
+
+
+@receiver(post_save, sender=Service)
+def reprice_rollup(sender, instance, created, raw=False, **kwargs):
+    """Пересчитывает выручку в сводке по новой цене услуги."""
+    if not raw and not created:
+        rollups.reprice_service(instance)
+
+
+@receiver(post_save, sender=CustomerCar)
+@receiver(post_delete, sender=CustomerCar)
+def invalidate_customer_dashboard(sender, instance, raw=False, **kwargs):
+    """Сбрасывает сводку клиента при изменении его машин."""
+    if not raw:
+        dashboard.invalidate_customers([instance.customer_id])
+
+
+@receiver(post_save, sender=CustomerCar)
+def schedule_image_variants(sender, instance, raw=False, **kwargs):
+    """Ставит в очередь создание копий нового фото машины клиента."""
+    if raw or images.has_actual_variants(instance):
+        return
+    images.schedule_variants(instance.pk)
+
+
+def bump_catalog_version(sender, **kwargs):
+    """Сбрасывает кэш ответов по измененному справочнику."""
+    catalog.bump_version(sender)
+
+
+for model in catalog.CATALOG_MODELS:
+    post_save.connect(bump_catalog_version, sender=model, dispatch_uid=f'catalog_save_{model._meta.label_lower}')
+    post_delete.connect(bump_catalog_version, sender=model, dispatch_uid=f'catalog_delete_{model._meta.label_lower}')
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import Group
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.main.models import Brand, Car, CustomerCar, Order, Service, ServiceCategory
+from apps.users.models import CustomUser
+from apps.users.roles import ADMINISTRATOR, CUSTOMER, EMPLOYEE
+from config.testing import CacheIsolatedTestCase
+
+
+class MainTestCase(CacheIsolatedTestCase):
+    """Создает роли, администратора, работника и клиента с машиной и услугой."""
+
+    def setUp(self):
+        super().setUp()
+        self.groups = {
+            name: Group.objects.create(name=name)
+            for name in (ADMINISTRATOR, EMPLOYEE, CUSTOMER)
+        }
+        self.administrator = self.create_user('admin@example.com', ADMINISTRATOR)
+        self.employee = self.create_user('employee@example.com', EMPLOYEE)
+        self.customer = self.create_user('customer@example.com', CUSTOMER)
+
+        self.brand = Brand.objects.create(name='Audi')
+        self.car = Car.objects.create(brand=self.brand, model='A4')
+        self.category = ServiceCategory.objects.create(name='Мойка')
+        self.service = Service.objects.create(service_category=self.category, name='Кузов', price=500)
+        self.customer_car = CustomerCar.objects.create(
+            car=self.car, customer=self.customer, year=2020, number='А123ВС77',
+        )
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.administrator)
+
+    def create_user(self, email, role, **fields):
+        user = CustomUser.objects.create_user(email, 'password', first_name='Имя', **fields)
+        user.groups.set([self.groups[role]])
+        return user
+
+    def create_order(self, start=None, hours=1, employee=None, **fields):
+        start = start or self.start
+        fields = {
+            'service': self.service,
+            'customer_car': self.customer_car,
+            'administrator': self.administrator,
+            'end_date': start + timedelta(hours=hours),
+            **fields,
+        }
+        return Order.objects.create(employee=employee or self.employee, start_date=start, **fields)
@@ -1,3 +1,806 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.transaction import TransactionManagementError
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+
+from api.auth.serializers import RoleTokenObtainPairSerializer
+from api.v1 import urls as v1_urls
+from api.v1.main.async_views import make_async_urlpatterns
+from api.v1.main.compiled import CompiledSerializer, NotCompilable, compile_serializer
+from api.v1.main.serializers import (
+    CarGetSerializer, CustomerCarGetSerializer, CustomUserWithGroupsGetSerializer, OrderGetSerializer,
+)
+from apps.main.models import Brand, Car, CustomerCar, Order, OrderRollup, Service, ServiceCategory
+from apps.main.orders import OrderConflict, update_order
+from apps.main.scheduling import find_overlaps
+from apps.main.testing import MainTestCase
+from apps.notifications.models import OutboxEmail
+from apps.users.models import CustomUser
+from apps.users.roles import ADMINISTRATOR, CUSTOMER, EMPLOYEE
+
+
+class ListQueryCountTest(MainTestCase):
+    """Количество запросов списка не зависит от числа строк на странице."""
+
+    page_size = 20
+
+    def create_orders(self, count):
+        offset = Order.objects.count()
+        for index in range(offset, offset + count):
+            self.create_order(self.start + timedelta(hours=2 * index))
+
+    def create_customer_cars(self, count):
+        for _ in range(count):
+            CustomerCar.objects.create(car=self.car, customer=self.customer, year=2020, number='В456ОР77')
+
+    def create_cars(self, count):
+        for index in range(count):
+            brand = Brand.objects.create(name=f'Марка {Brand.objects.count()}')
+            Car.objects.create(brand=brand, model=f'Модель {index}')
+
+    def create_services(self, count):
+        for index in range(count):
+            category = ServiceCategory.objects.create(name=f'Категория {ServiceCategory.objects.count()}')
+            Service.objects.create(service_category=category, name=f'Услуга {index}', price=100)
+
+    def create_users(self, count):
+        offset = CustomUser.objects.count()
+        for index in range(offset, offset + count):
+            self.create_user(f'user{index}@example.com', EMPLOYEE)
+
+    def get_results(self, url):
+        cache.clear()
+        response = self.client.get(url, {'page_size': self.page_size})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def assert_constant_queries(self, url, model, create_rows):
+        """Сравнивает количество запросов для страницы из 3 и из 20 строк."""
+        create_rows(3 - model.objects.count())
+        with mock.patch.object(PageNumberPagination, 'page_size', self.page_size):
+            # Первый запрос запоминает роли пользователя
+            self.get_results(url)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(len(self.get_results(url)), 3)
+
+            create_rows(self.page_size - model.objects.count())
+            with self.assertNumQueries(len(queries)):
+                self.assertEqual(len(self.get_results(url)), self.page_size)
+
+    def check_all(self):
+        self.assert_constant_queries('/api/v1/orders/', Order, self.create_orders)
+        self.assert_constant_queries('/api/v1/customer_cars/', CustomerCar, self.create_customer_cars)
+        self.assert_constant_queries('/api/v1/cars/', Car, self.create_cars)
+        self.assert_constant_queries('/api/v1/services/', Service, self.create_services)
+        self.assert_constant_queries('/api/v1/users/', CustomUser, self.create_users)
+
+    @override_settings(COMPILED_READ_SERIALIZERS=True)
+    def test_compiled_serializers(self):
+        self.check_all()
+
+    @override_settings(COMPILED_READ_SERIALIZERS=False)
+    def test_model_serializers(self):
+        self.check_all()
+
+
+class CatalogCacheTest(MainTestCase):
+    """ETag ответа справочника меняется вместе с содержимым."""
+
+    def test_etag_follows_content(self):
+        response = self.client.get('/api/v1/brands/')
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get('/api/v1/brands/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Brand.objects.filter(pk=self.brand.pk).update(name='BMW')
+        cache.clear()
+        response = self.client.get('/api/v1/brands/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['name'], 'BMW')
+
+
+class ImageVariantsTest(MainTestCase):
+    """Копии фото машины клиента создаются заново при замене фото."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, CAR_IMAGE_VARIANTS_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, name, car=None):
+        car = car or self.customer_car
+        buffer = BytesIO()
+        Image.new('RGB', (64, 48), 'red').save(buffer, 'JPEG')
+        with self.captureOnCommitCallbacks(execute=True):
+            car.image.save(name, ContentFile(buffer.getvalue()))
+        car.refresh_from_db()
+        return car.image_thumbnail, car.image_webp
+
+    def test_replaced_image_variants_are_deleted(self):
+        old_variants = self.upload('first.jpg')
+        storage = self.customer_car.image.storage
+        self.assertTrue(all(storage.exists(variant.name) for variant in old_variants))
+
+        new_variants = self.upload('second.jpg')
+
+        self.assertTrue(all(storage.exists(variant.name) for variant in new_variants))
+        self.assertFalse(any(storage.exists(variant.name) for variant in old_variants))
+
+    def test_variants_of_other_car_are_kept(self):
+        variants = self.upload('photo.jpg')
+        storage = self.customer_car.image.storage
+        # Фото с тем же именем файла в другом каталоге
+        other_car = CustomerCar.objects.create(car=self.car, customer=self.customer, year=2021, number='В456ОР77')
+        other_name = storage.save('legacy/photo.jpg', ContentFile(storage.open(self.customer_car.image.name).read()))
+        other_car.image = other_name
+        with self.captureOnCommitCallbacks(execute=True):
+            other_car.save()
+        other_car.refresh_from_db()
+        other_variants = (other_car.image_thumbnail, other_car.image_webp)
+
+        self.upload('second.jpg', other_car)
+
+        self.assertTrue(all(variant for variant in other_variants))
+        self.assertTrue(set(map(str, variants)).isdisjoint(map(str, other_variants)))
+        self.assertTrue(all(storage.exists(variant.name) for variant in variants))
+        self.assertFalse(any(storage.exists(variant.name) for variant in other_variants))
+
+
+class OrderUpdateTest(MainTestCase):
+    """Изменение заказа с проверкой версии и допустимости смены статуса."""
+
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_order()
+
+    def patch(self, data):
+        return self.client.patch(f'/api/v1/orders/{self.order.pk}/', data, format='json')
+
+    def test_current_version_is_applied(self):
+        response = self.patch({'status': Order.COMPLETED, 'version': 0})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['version'], 1)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+
+    def test_stale_version_conflicts(self):
+        Order.objects.filter(pk=self.order.pk).update(version=1)
+
+        response = self.patch({'status': Order.COMPLETED, 'version': 0})
+
+        self.assertEqual(response.status_code, 409)
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.status, self.order.version), (Order.IN_PROGRESS, 1))
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_forbidden_status_transition(self):
+        Order.objects.filter(pk=self.order.pk).update(status=Order.COMPLETED)
+
+        with mock.patch.dict(Order.STATUS_TRANSITIONS, {Order.COMPLETED: ()}):
+            response = self.patch({'status': Order.IN_PROGRESS})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.json())
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, Order.COMPLETED)
+
+    def test_concurrent_completion_sends_one_email(self):
+        first = Order.objects.get(pk=self.order.pk)
+        second = Order.objects.get(pk=self.order.pk)
+
+        self.assertTrue(update_order(first, {'status': Order.COMPLETED}))
+        with self.assertRaises(OrderConflict):
+            update_order(second, {'status': Order.COMPLETED})
+
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).version, 1)
+
+
+class OrderOverlapTest(MainTestCase):
+    """Заказы одного работника не пересекаются по времени."""
+
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_order()
+        self.other_employee = self.create_user('other@example.com', EMPLOYEE)
+
+    def make_item(self, start, hours=1, employee=None):
+        return {
+            'service': self.service.pk,
+            'customer_car': self.customer_car.pk,
+            'employee': (employee or self.employee).pk,
+            'administrator': self.administrator.pk,
+            'start_date': start.isoformat(),
+            'end_date': (start + timedelta(hours=hours)).isoformat(),
+        }
+
+    def test_overlapping_create_rejected(self):
+        response = self.client.post(
+            '/api/v1/orders/', self.make_item(self.start + timedelta(minutes=30)), format='json',
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('employee', response.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_same_slot_for_other_employee(self):
+        response = self.client.post(
+            '/api/v1/orders/', self.make_item(self.start, employee=self.other_employee), format='json',
+        )
+
+        self.assertEqual(response.status_code, 201)
+
+    def test_adjacent_order_allowed(self):
+        response = self.client.post('/api/v1/orders/', self.make_item(self.start + timedelta(hours=1)), format='json')
+
+        self.assertEqual(response.status_code, 201)
+
+    def test_overlap_inside_bulk_request(self):
+        start = self.start + timedelta(days=1)
+        items = [self.make_item(start), self.make_item(start + timedelta(minutes=30))]
+
+        response = self.client.post('/api/v1/orders/bulk/', items, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), [{}, {'employee': ['У работника уже есть заказ в это время']}])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_bulk_update_can_swap_orders(self):
+        later = self.create_order(self.start + timedelta(hours=1))
+        items = [
+            {'id': self.order.pk, 'start_date': later.start_date.isoformat(), 'end_date': later.end_date.isoformat()},
+            {'id': later.pk, 'start_date': self.order.start_date.isoformat(), 'end_date': self.order.end_date.isoformat()},
+        ]
+
+        response = self.client.patch('/api/v1/orders/bulk/', items, format='json')
+
+        self.assertEqual(response.status_code, 200)
+
+
+class DashboardTest(MainTestCase):
+    """Сводка клиента кэшируется и сбрасывается при изменении его заказов."""
+
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_order()
+        self.create_order(self.start + timedelta(hours=2), status=Order.COMPLETED)
+        self.customer_client = APIClient()
+        self.customer_client.force_authenticate(self.customer)
+
+    def get_dashboard(self, client=None):
+        response = (client or self.customer_client).get('/api/v1/me/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_dashboard(self):
+        with self.assertNumQueries(4):
+            data = self.get_dashboard()
+
+        self.assertEqual([car['id'] for car in data['cars']], [self.customer_car.pk])
+        self.assertEqual([order['id'] for order in data['active_orders']], [self.order.pk])
+        self.assertEqual(data['totals'], {'orders': 2, 'active_orders': 1, 'completed_orders': 1, 'spent': 500})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_dashboard(), data)
+
+    def test_invalidated_on_order_change(self):
+        self.get_dashboard()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/v1/orders/{self.order.pk}/', {'status': Order.COMPLETED}, format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+
+        data = self.get_dashboard()
+        self.assertEqual(data['active_orders'], [])
+        self.assertEqual(data['totals']['spent'], 1000)
+
+    def test_invalidated_for_both_customers_on_car_change(self):
+        other_customer = self.create_user('other@example.com', CUSTOMER)
+        other_car = CustomerCar.objects.create(car=self.car, customer=other_customer, year=2021, number='В456ОР77')
+        other_client = APIClient()
+        other_client.force_authenticate(other_customer)
+        self.assertEqual(self.get_dashboard()['totals']['orders'], 2)
+        self.assertEqual(self.get_dashboard(other_client)['totals']['orders'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/v1/orders/{self.order.pk}/', {'customer_car': other_car.pk}, format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.get_dashboard()['totals']['orders'], 1)
+        self.assertEqual(self.get_dashboard(other_client)['totals']['orders'], 1)
+
+        # Обратный перенос через save проходит по сигналам
+        order = Order.objects.get(pk=self.order.pk)
+        order.customer_car = self.customer_car
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+
+        self.assertEqual(self.get_dashboard()['totals']['orders'], 2)
+        self.assertEqual(self.get_dashboard(other_client)['totals']['orders'], 0)
+
+
+class BulkOrderTest(MainTestCase):
+    """Пачка заказов применяется целиком или возвращает ошибки по элементам."""
+
+    def make_item(self, start, **fields):
+        return {
+            'service': self.service.pk,
+            'customer_car': self.customer_car.pk,
+            'employee': self.employee.pk,
+            'administrator': self.administrator.pk,
+            'start_date': start.isoformat(),
+            'end_date': (start + timedelta(hours=1)).isoformat(),
+            **fields,
+        }
+
+    def test_create(self):
+        items = [self.make_item(self.start), self.make_item(self.start + timedelta(hours=1))]
+
+        response = self.client.post('/api/v1/orders/bulk/', items, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([order['id'] for order in response.json()], list(Order.objects.values_list('pk', flat=True)))
+
+    def test_create_with_invalid_item(self):
+        items = [self.make_item(self.start), self.make_item(self.start + timedelta(hours=1), service=0)]
+
+        response = self.client.post('/api/v1/orders/bulk/', items, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertIn('service', errors[1])
+        self.assertFalse(Order.objects.exists())
+
+    def test_update(self):
+        first = self.create_order()
+        second = self.create_order(self.start + timedelta(hours=1))
+        items = [{'id': first.pk, 'status': Order.COMPLETED}, {'id': second.pk, 'status': Order.COMPLETED}]
+
+        response = self.client.patch('/api/v1/orders/bulk/', items, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.filter(status=Order.COMPLETED).count(), 2)
+
+    def test_update_with_missing_order(self):
+        order = self.create_order()
+        items = [{'id': order.pk, 'status': Order.COMPLETED}, {'id': order.pk + 1, 'status': Order.COMPLETED}]
+
+        response = self.client.patch('/api/v1/orders/bulk/', items, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), [{}, {'id': ['Заказ не найден']}])
+        self.assertEqual(Order.objects.get(pk=order.pk).status, Order.IN_PROGRESS)
+
+    def test_empty_batch_rejected(self):
+        response = self.client.post('/api/v1/orders/bulk/', [], format='json')
+
+        self.assertEqual(response.status_code, 400)
+
+
+class KeysetPaginationTest(MainTestCase):
+    """Курсор хранит (start_date, id) и не теряет заказы с равным началом."""
+
+    def setUp(self):
+        super().setUp()
+        starts = [self.start, *[self.start + timedelta(hours=1)] * 3, self.start + timedelta(hours=2)]
+        orders = [self.create_order(start) for start in starts]
+        orders.sort(key=lambda order: (order.start_date, order.pk), reverse=True)
+        self.expected = [order.pk for order in orders]
+
+    def get_page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [order['id'] for order in data['results']], data['next'], data['previous']
+
+    def test_pages_split_equal_start_dates(self):
+        pages = []
+        url = '/api/v1/orders/?page_size=2'
+        while url:
+            ids, url, _ = self.get_page(url)
+            pages.append(ids)
+
+        self.assertEqual(pages, [self.expected[0:2], self.expected[2:4], self.expected[4:]])
+
+    def test_previous_link(self):
+        _, second, _ = self.get_page('/api/v1/orders/?page_size=2')
+        _, third, _ = self.get_page(second)
+        ids, _, previous = self.get_page(third)
+        self.assertEqual(ids, self.expected[4:])
+
+        ids, _, previous = self.get_page(previous)
+        self.assertEqual(ids, self.expected[2:4])
+        ids, _, previous = self.get_page(previous)
+        self.assertEqual(ids, self.expected[0:2])
+        self.assertIsNone(previous)
+
+    def test_invalid_cursor(self):
+        for position in ('5', '["x","1"]', '["2026-01-01 00:00:00+00:00"]'):
+            cursor = base64.b64encode(urlencode({'p': position}).encode()).decode()
+            response = self.client.get('/api/v1/orders/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
+
+class FreeSlotsTest(MainTestCase):
+    """Поиск свободного времени работников в окне под длительность услуги."""
+
+    url = '/api/v1/schedule/free-slots/'
+
+    def setUp(self):
+        super().setUp()
+        self.create_order()
+        self.window = {
+            'service': self.service.pk,
+            'start': (self.start - timedelta(hours=1)).isoformat(),
+            'end': (self.start + timedelta(hours=3)).isoformat(),
+        }
+
+    def get_slots(self, response):
+        return {
+            result['employee']['id']: [
+                (parse_datetime(slot['start']), parse_datetime(slot['end'])) for slot in result['slots']
+            ]
+            for result in response.json()['results']
+        }
+
+    def test_slots_around_orders(self):
+        other = self.create_user('other@example.com', EMPLOYEE)
+
+        response = self.client.get(self.url, self.window)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_slots(response), {
+            self.employee.pk: [
+                (self.start - timedelta(hours=1), self.start),
+                (self.start + timedelta(hours=1), self.start + timedelta(hours=3)),
+            ],
+            other.pk: [(self.start - timedelta(hours=1), self.start + timedelta(hours=3))],
+        })
+
+    def test_short_gaps_skipped(self):
+        Service.objects.filter(pk=self.service.pk).update(duration=90)
+
+        response = self.client.get(self.url, {**self.window, 'employee': self.employee.pk})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_slots(response), {
+            self.employee.pk: [(self.start + timedelta(hours=1), self.start + timedelta(hours=3))],
+        })
+
+    def test_invalid_window_rejected(self):
+        response = self.client.get(self.url, {**self.window, 'end': self.window['start']})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('end', response.json())
+
+    def test_non_employee_rejected(self):
+        response = self.client.get(self.url, {**self.window, 'employee': self.customer.pk})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('employee', response.json())
+
+
+class RollupTest(MainTestCase):
+    """Сводка по заказам совпадает с агрегатом по самим заказам."""
+
+    def setUp(self):
+        super().setUp()
+        self.other_service = Service.objects.create(service_category=self.category, name='Салон', price=300)
+        self.order = self.create_order()
+        self.create_order(self.start + timedelta(days=1), status=Order.COMPLETED)
+
+    def assert_rollup_matches_orders(self):
+        expected = {
+            (row['day'], row['service_id'], row['status']): (row['order_count'], row['revenue'])
+            for row in (
+                Order.objects
+                .annotate(day=TruncDate('start_date'))
+                .values('day', 'service_id', 'status')
+                .annotate(order_count=Count('id'), revenue=Sum('service__price'))
+                .order_by()
+            )
+        }
+        actual = {
+            (row.day, row.service_id, row.status): (row.order_count, row.revenue)
+            for row in OrderRollup.objects.exclude(order_count=0)
+        }
+        self.assertEqual(actual, expected)
+
+    def test_create(self):
+        self.create_order(self.start + timedelta(hours=1), service=self.other_service)
+
+        self.assert_rollup_matches_orders()
+
+    def test_status_change(self):
+        update_order(self.order, {'status': Order.COMPLETED})
+
+        self.assert_rollup_matches_orders()
+
+    def test_service_change(self):
+        self.order.service = self.other_service
+        self.order.save()
+
+        self.assert_rollup_matches_orders()
+
+    def test_delete(self):
+        self.order.delete()
+
+        self.assert_rollup_matches_orders()
+
+    def test_price_change(self):
+        self.service.price = 700
+        self.service.save()
+
+        self.assert_rollup_matches_orders()
+
+    def test_partially_loaded_orders(self):
+        order = Order.objects.only('id', 'version').get(pk=self.order.pk)
+        order.status = Order.COMPLETED
+        order.save()
+        self.assert_rollup_matches_orders()
+
+        update_order(Order.objects.defer('start_date').get(pk=self.order.pk), {'service': self.other_service})
+        self.assert_rollup_matches_orders()
+
+        Order.objects.only('id').get(pk=self.order.pk).delete()
+        self.assert_rollup_matches_orders()
+
+
+class OrderExportTest(MainTestCase):
+    """Выгрузка отфильтрованных заказов в CSV и NDJSON потоком."""
+
+    url = '/api/v1/orders/export/'
+
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_order()
+        other_employee = self.create_user('other@example.com', EMPLOYEE)
+        self.create_order(employee=other_employee)
+
+    def export(self, export_format):
+        response = self.client.get(self.url, {'export_format': export_format, 'employee': self.employee.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        rows = list(csv.DictReader(StringIO(self.export('csv'))))
+
+        self.assertEqual([row['id'] for row in rows], [str(self.order.pk)])
+        self.assertEqual(rows[0]['employee_email'], self.employee.email)
+        self.assertEqual(rows[0]['start_date'], self.order.start_date.isoformat())
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.export('ndjson').splitlines()]
+
+        self.assertEqual([row['id'] for row in rows], [self.order.pk])
+        self.assertEqual(rows[0]['price'], self.service.price)
+        self.assertEqual(rows[0]['number'], self.customer_car.number)
+
+    def test_unknown_format_rejected(self):
+        response = self.client.get(self.url, {'export_format': 'xml'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('export_format', response.json())
+
+
+class CarImageUploadTest(MainTestCase):
+    """Фото машины проверяется по размеру и первым байтам до сохранения."""
+
+    max_size = 4096
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            CAR_IMAGE_UPLOAD_TEMP_DIR=f'{media_root}/.uploads',
+            CAR_IMAGE_MAX_UPLOAD_SIZE=self.max_size,
+            CAR_IMAGE_VARIANTS_ASYNC=False,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.url = f'/api/v1/customer_cars/{self.customer_car.pk}/'
+
+    def upload(self, content, name='photo.jpg'):
+        file = SimpleUploadedFile(name, content, content_type='image/jpeg')
+        return self.client.patch(self.url, {'image': file}, format='multipart')
+
+    def test_image_saved(self):
+        buffer = BytesIO()
+        Image.new('RGB', (64, 48), 'red').save(buffer, 'JPEG')
+
+        response = self.upload(buffer.getvalue())
+
+        self.assertEqual(response.status_code, 200)
+        self.customer_car.refresh_from_db()
+        self.assertTrue(self.customer_car.image.name.startswith('cars/photo'))
+
+    def test_too_large_upload_rejected(self):
+        response = self.upload(b'\xff\xd8\xff' + b'\0' * self.max_size)
+
+        self.assertEqual(response.status_code, 413)
+        self.customer_car.refresh_from_db()
+        self.assertFalse(self.customer_car.image)
+
+    def test_wrong_signature_rejected(self):
+        response = self.upload(b'<?php echo "not an image"; ?>')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.json())
+        self.customer_car.refresh_from_db()
+        self.assertFalse(self.customer_car.image)
+
+
+class CompiledSerializerTest(MainTestCase):
+    """Скомпилированный сериализатор отдает те же данные, что и обычный."""
+
+    def setUp(self):
+        super().setUp()
+        self.employee.groups.add(self.groups[ADMINISTRATOR])
+        CustomerCar.objects.filter(pk=self.customer_car.pk).update(
+            image='cars/photo.jpg', image_thumbnail='cars/variants/photo_thumb.jpg',
+        )
+        CustomerCar.objects.create(car=self.car, customer=self.customer, year=2021, number='В456ОР77')
+        self.create_order()
+        self.create_order(self.start + timedelta(hours=1), status=Order.COMPLETED)
+        self.request = RequestFactory().get('/api/v1/orders/')
+
+    def assert_same_data(self, serializer_class, queryset, change_row=None):
+        compiled = compile_serializer(serializer_class)
+        rows = list(queryset.values(*compiled.columns))
+        instances = list(queryset)
+        if change_row is not None:
+            for row, instance in zip(rows, instances):
+                change_row(row, instance)
+
+        expected = serializer_class(instances, many=True, context={'request': self.request}).data
+        self.assertEqual(compiled.serialize(rows, self.request), expected)
+
+    def test_orders(self):
+        self.assert_same_data(OrderGetSerializer, Order.objects.order_by('pk'))
+
+    def test_customer_cars(self):
+        self.assert_same_data(CustomerCarGetSerializer, CustomerCar.objects.order_by('pk'))
+
+    def test_users_with_groups(self):
+        self.assert_same_data(CustomUserWithGroupsGetSerializer, CustomUser.objects.order_by('pk'))
+
+    def test_null_relation(self):
+        # В схеме нет необязательных внешних ключей: строка и заказ
+        # приводятся к виду, который дает LEFT JOIN по пустой связи
+        def clear_employee(row, order):
+            for column in row:
+                if column.startswith('employee'):
+                    row[column] = None
+            order.employee = None
+
+        self.assert_same_data(OrderGetSerializer, Order.objects.order_by('pk'), clear_employee)
+
+    def test_not_compilable_fields_fall_back(self):
+        class MethodFieldSerializer(CustomerCarGetSerializer):
+            title = serializers.SerializerMethodField()
+
+            class Meta(CustomerCarGetSerializer.Meta):
+                fields = (*CustomerCarGetSerializer.Meta.fields, 'title')
+
+            def get_title(self, obj):
+                return str(obj)
+
+        class WholeObjectSerializer(CustomerCarGetSerializer):
+            car_info = CarGetSerializer(source='*', read_only=True)
+
+            class Meta(CustomerCarGetSerializer.Meta):
+                fields = (*CustomerCarGetSerializer.Meta.fields, 'car_info')
+
+        for serializer_class in (MethodFieldSerializer, WholeObjectSerializer):
+            with self.subTest(serializer_class.__name__):
+                self.assertIsNone(compile_serializer(serializer_class))
+                with self.assertRaises(NotCompilable):
+                    CompiledSerializer(serializer_class())
+
+
+# Маршруты API с асинхронным чтением, как при ASYNC_READ_VIEWS=True
+urlpatterns = [
+    path('api/v1/', include(make_async_urlpatterns(v1_urls.router.urls, v1_urls.ASYNC_VIEWSETS))),
+]
+
+
+class AsyncReadViewTest(MainTestCase):
+    """Асинхронные представления чтения отвечают так же, как синхронные."""
+
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_order()
+        self.detail_urls = {
+            'brands': self.brand.pk,
+            'cars': self.car.pk,
+            'service_categories': self.category.pk,
+            'services': self.service.pk,
+            'roles': self.groups[ADMINISTRATOR].pk,
+            'customer_cars': self.customer_car.pk,
+            'orders': self.order.pk,
+        }
+
+    def get(self, url, user, use_async):
+        headers = {'Authorization': f'Bearer {RoleTokenObtainPairSerializer.get_token(user).access_token}'}
+        if not use_async:
+            return APIClient().get(url, headers=headers)
+        async def aget():
+            return await self.async_client.get(url, headers=headers)
+
+        with self.settings(ROOT_URLCONF=__name__):
+            return async_to_sync(aget)()
+
+    def assert_same_response(self, url, user, status_code, falls_back=False):
+        sync_response = self.get(url, user, use_async=False)
+        if falls_back:
+            async_response = self.get(url, user, use_async=True)
+        else:
+            # Ответ должен быть собран без перехода в синхронное представление
+            with mock.patch('api.v1.main.async_views.sync_to_async', side_effect=AssertionError(url)):
+                async_response = self.get(url, user, use_async=True)
+
+        self.assertEqual(sync_response.status_code, status_code)
+        self.assertEqual(async_response.status_code, status_code)
+        self.assertEqual(async_response.json(), sync_response.json())
+
+    def test_list_and_retrieve(self):
+        for prefix, pk in self.detail_urls.items():
+            with self.subTest(prefix):
+                self.assert_same_response(f'/api/v1/{prefix}/', self.administrator, 200)
+                self.assert_same_response(f'/api/v1/{prefix}/{pk}/', self.administrator, 200)
+
+    def test_customer_sees_own_orders(self):
+        self.assert_same_response('/api/v1/orders/', self.customer, 200)
+
+    def test_permission_denied(self):
+        for prefix in ('brands', 'customer_cars'):
+            with self.subTest(prefix):
+                self.assert_same_response(f'/api/v1/{prefix}/', self.customer, 403, falls_back=True)
+
+    def test_not_found(self):
+        for prefix in self.detail_urls:
+            with self.subTest(prefix):
+                self.assert_same_response(f'/api/v1/{prefix}/999999/', self.administrator, 404, falls_back=True)
+
+
+class OverlapTransactionTest(SimpleTestCase):
+    """Проверка пересечений без транзакции не выполняется."""
+
+    def test_outside_atomic_rejected(self):
+        start = timezone.now()
+
+        with self.assertRaises(TransactionManagementError):
+            find_overlaps([(1, start, start + timedelta(hours=1))])
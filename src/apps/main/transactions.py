@@ -0,0 +1,50 @@
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+LOCK_ERRORS = ('database is locked', 'database table is locked', 'database is busy')
+
+
+def is_lock_error(error) -> bool:
+    return isinstance(error, OperationalError) and any(message in str(error) for message in LOCK_ERRORS)
+
+
+def get_lock_retry_delay(attempt) -> float:
+    """Задержка перед повтором: экспоненциальная с полным случайным разбросом."""
+    delay = min(settings.SQLITE_LOCK_RETRY_MAX_DELAY, settings.SQLITE_LOCK_RETRY_BASE_DELAY * 2 ** attempt)
+    return random.uniform(0, delay)
+
+
+def retry_on_lock(func):
+    """
+    Выполняет функцию в транзакции и повторяет ее целиком,
+    если база заблокирована другим процессом.
+    Внутри уже открытой транзакции повтор невозможен, поэтому функция
+    вызывается как есть, а ошибку обработает внешний вызов.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if connection.in_atomic_block:
+            return func(*args, **kwargs)
+
+        attempt = 0
+        while True:
+            try:
+                with transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if not is_lock_error(error) or attempt >= settings.SQLITE_LOCK_RETRIES:
+                    raise
+                delay = get_lock_retry_delay(attempt)
+                logger.warning('База заблокирована, повтор через %.3f с: %s', delay, func.__qualname__)
+                time.sleep(delay)
+                attempt += 1
+
+    return wrapper
@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import OutboxEmail
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    """Просмотр очереди писем"""
+
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'sent_at',)
+    list_filter = ('status',)
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.notifications.services import drain_outbox
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди пачками через одно SMTP-соединение'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Количество писем в одной пачке')
+        parser.add_argument('--loop', action='store_true',
+                            help='Работать постоянно, опрашивая очередь')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Пауза между опросами очереди в секундах')
+
+    def handle(self, *args, **options):
+        delay = options['interval']
+        while True:
+            try:
+                sent, failed = drain_outbox(options['batch_size'])
+            except OSError as error:
+                # SMTP-сервер недоступен: письма остаются в очереди без учета
+                # попытки, пауза перед следующим опросом увеличивается
+                delay = min(delay * 2, settings.OUTBOX_RETRY_MAX_DELAY)
+                self.stderr.write(f'SMTP-сервер недоступен: {error!r}')
+            else:
+                delay = options['interval']
+                if sent or failed:
+                    self.stdout.write(f'Отправлено: {sent}, с ошибкой: {failed}')
+
+            if not options['loop']:
+                break
+            time.sleep(delay)
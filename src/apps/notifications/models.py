@@ -0,0 +1,83 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class OutboxEmail(models.Model):
+    """
+    Модель письма в очереди на отправку.
+
+    Атрибуты:
+        subject (str): Тема письма.
+        message (str): Текст письма.
+        from_email (str): Адрес отправителя.
+        recipients (list): Адреса получателей.
+        status (int): Статус отправки.
+        attempts (int): Количество неудачных попыток отправки.
+        last_error (str): Текст последней ошибки отправки.
+        next_attempt_at (datetime): Дата и время следующей попытки отправки.
+        created_at (datetime): Дата и время постановки в очередь.
+        sent_at (datetime): Дата и время отправки.
+    """
+
+    PENDING = 0
+    SENT = 1
+    FAILED = 2
+
+    STATUSES = (
+        (PENDING, 'Ожидает отправки'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    subject = models.CharField(
+        verbose_name=_('Тема'),
+        max_length=255,
+    )
+    message = models.TextField(
+        verbose_name=_('Текст'),
+    )
+    from_email = models.CharField(
+        verbose_name=_('Отправитель'),
+        max_length=254,
+        blank=True,
+    )
+    recipients = models.JSONField(
+        verbose_name=_('Получатели'),
+    )
+    status = models.PositiveSmallIntegerField(
+        verbose_name=_('Статус'),
+        choices=STATUSES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name=_('Попытки'),
+        default=0,
+    )
+    last_error = models.TextField(
+        verbose_name=_('Последняя ошибка'),
+        blank=True,
+    )
+    next_attempt_at = models.DateTimeField(
+        verbose_name=_('Следующая попытка'),
+        default=timezone.now,
+    )
+    created_at = models.DateTimeField(
+        verbose_name=_('Создано'),
+        auto_now_add=True,
+    )
+    sent_at = models.DateTimeField(
+        verbose_name=_('Отправлено'),
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = _('Письмо')
+        verbose_name_plural = _('Очередь писем')
+        indexes = (
+            models.Index(fields=('status', 'next_attempt_at')),
+        )
+
+    def __str__(self) -> str:
+        return self.subject
@@ -0,0 +1,192 @@
+import logging
+import random
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxConnectionError(OSError):
+    """
+    SMTP-соединение потеряно во время отправки пачки. Неотправленные
+    письма пачки возвращены в очередь без учета попытки.
+
+    Атрибуты:
+        sent (int): Количество писем пачки, отправленных до потери соединения.
+        failed (int): Количество писем пачки, не принятых сервером.
+    """
+
+    def __init__(self, error, sent=0, failed=0):
+        super().__init__(repr(error))
+        self.sent = sent
+        self.failed = failed
+
+
+def is_connection_error(error: Exception) -> bool:
+    """
+    Проверяет, что ошибка относится к соединению, а не к письму:
+    такие ошибки не расходуют попытки отправки писем.
+    """
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    # SMTPException наследует OSError, но означает отказ сервера принять письмо
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def build_email(subject, message, recipient_list, from_email=None) -> OutboxEmail:
+    """Создает письмо для очереди, не сохраняя его."""
+    return OutboxEmail(
+        subject=subject,
+        message=message,
+        from_email=from_email or '',
+        recipients=list(recipient_list),
+    )
+
+
+def enqueue_email(subject, message, recipient_list, from_email=None) -> OutboxEmail:
+    """
+    Ставит письмо в очередь на отправку.
+    Вызывается в той же транзакции, что и изменение, вызвавшее письмо.
+    """
+    email = build_email(subject, message, recipient_list, from_email)
+    email.save()
+    return email
+
+
+def enqueue_emails(emails) -> list:
+    """Ставит в очередь несколько писем одним запросом."""
+    return OutboxEmail.objects.bulk_create(emails)
+
+
+def get_retry_delay(attempts: int) -> timedelta:
+    """Возвращает задержку перед следующей попыткой (экспоненциальная с разбросом)."""
+    delay = min(
+        settings.OUTBOX_RETRY_BASE_DELAY * 2 ** (attempts - 1),
+        settings.OUTBOX_RETRY_MAX_DELAY,
+    )
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(batch_size: int) -> list:
+    """
+    Забирает из очереди пачку писем, готовых к отправке.
+    Письма резервируются сдвигом времени следующей попытки,
+    чтобы параллельный обработчик их не взял.
+    """
+    now = timezone.now()
+    ids = list(
+        OutboxEmail.objects
+        .filter(status=OutboxEmail.PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+
+    lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE_TIMEOUT)
+    OutboxEmail.objects.filter(
+        pk__in=ids, status=OutboxEmail.PENDING, next_attempt_at__lte=now,
+    ).update(next_attempt_at=lease_until)
+    return list(OutboxEmail.objects.filter(pk__in=ids, next_attempt_at=lease_until))
+
+
+def _mark_failed(email: OutboxEmail, error: Exception):
+    email.attempts += 1
+    email.last_error = repr(error)
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = OutboxEmail.FAILED
+    else:
+        email.next_attempt_at = timezone.now() + get_retry_delay(email.attempts)
+    email.save(update_fields=('attempts', 'last_error', 'status', 'next_attempt_at',))
+
+
+def release(emails):
+    """Возвращает зарезервированные письма в очередь, не расходуя попытки."""
+    OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(next_attempt_at=timezone.now())
+
+
+def mark_sent(ids):
+    if ids:
+        OutboxEmail.objects.filter(pk__in=ids).update(
+            status=OutboxEmail.SENT,
+            sent_at=timezone.now(),
+            last_error='',
+        )
+
+
+def send_batch(connection, batch_size=None) -> tuple:
+    """
+    Отправляет одну пачку писем через переданное SMTP-соединение.
+    Возвращает количество отправленных и неотправленных писем.
+    При потере соединения останавливает пачку и вызывает OutboxConnectionError.
+    """
+    emails = claim_batch(batch_size or settings.OUTBOX_BATCH_SIZE)
+    sent_ids = []
+    failed = 0
+
+    for position, email in enumerate(emails):
+        message = EmailMessage(
+            subject=email.subject,
+            body=email.message,
+            from_email=email.from_email or None,
+            to=email.recipients,
+            connection=connection,
+        )
+        try:
+            message.send()
+        except Exception as error:
+            if is_connection_error(error):
+                logger.warning('SMTP-соединение потеряно при отправке письма %s: %r', email.pk, error)
+                mark_sent(sent_ids)
+                release(emails[position:])
+                raise OutboxConnectionError(error, len(sent_ids), failed) from error
+            logger.warning('Не удалось отправить письмо %s: %r', email.pk, error)
+            _mark_failed(email, error)
+            failed += 1
+        else:
+            sent_ids.append(email.pk)
+
+    mark_sent(sent_ids)
+    return len(sent_ids), failed
+
+
+def drain_outbox(batch_size=None) -> tuple:
+    """
+    Отправляет все готовые письма пачками через одно SMTP-соединение.
+    Потерянное соединение открывается заново; если и после этого
+    не отправлено ни одного письма, вызывается OutboxConnectionError.
+    Возвращает количество отправленных и неотправленных писем.
+    """
+    total_sent = total_failed = 0
+    reconnected = False
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        while True:
+            try:
+                sent, failed = send_batch(connection, batch_size)
+            except OutboxConnectionError as error:
+                total_sent += error.sent
+                total_failed += error.failed
+                if reconnected and not error.sent:
+                    raise
+                reconnected = True
+                connection.close()
+                connection.open()
+                continue
+
+            total_sent += sent
+            total_failed += failed
+            if not sent and not failed:
+                break
+            reconnected = False
+    finally:
+        connection.close()
+    return total_sent, total_failed
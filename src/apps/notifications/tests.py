@@ -0,0 +1,109 @@
+import smtplib
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import override_settings
+from django.utils import timezone
+
+from apps.main.models import Order
+from apps.main.orders import update_order
+from apps.main.testing import MainTestCase
+from apps.notifications.models import OutboxEmail
+from apps.notifications.services import OutboxConnectionError, drain_outbox, enqueue_email
+from config.testing import CacheIsolatedTestCase
+
+REJECTED = 'rejected@example.com'
+
+
+class FlakyEmailBackend(EmailBackend):
+    """
+    Тестовый бэкенд: отклоняет письма на REJECTED, а первые `disconnects`
+    отправок завершает потерей соединения.
+    """
+
+    disconnects = 0
+    opened = 0
+
+    def open(self):
+        FlakyEmailBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        if FlakyEmailBackend.disconnects:
+            FlakyEmailBackend.disconnects -= 1
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        if any(REJECTED in message.to for message in messages):
+            raise smtplib.SMTPRecipientsRefused({REJECTED: (550, b'User unknown')})
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND=f'{__name__}.FlakyEmailBackend')
+class DrainOutboxTest(CacheIsolatedTestCase):
+    """Отправка очереди писем при ошибках писем и соединения."""
+
+    def setUp(self):
+        FlakyEmailBackend.disconnects = 0
+        FlakyEmailBackend.opened = 0
+
+    def enqueue(self, *recipients):
+        return [enqueue_email('Тема', 'Текст', [recipient]) for recipient in recipients]
+
+    def test_permanent_failure_uses_attempt(self):
+        rejected, accepted = self.enqueue(REJECTED, 'ok@example.com')
+
+        self.assertEqual(drain_outbox(), (1, 1))
+
+        rejected.refresh_from_db()
+        self.assertEqual(rejected.status, OutboxEmail.PENDING)
+        self.assertEqual(rejected.attempts, 1)
+        self.assertGreater(rejected.next_attempt_at, timezone.now())
+        self.assertEqual(OutboxEmail.objects.get(pk=accepted.pk).status, OutboxEmail.SENT)
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=1)
+    def test_permanent_failure_after_last_attempt(self):
+        rejected, = self.enqueue(REJECTED)
+
+        drain_outbox()
+
+        rejected.refresh_from_db()
+        self.assertEqual(rejected.status, OutboxEmail.FAILED)
+
+    def test_disconnect_reconnects_without_using_attempts(self):
+        self.enqueue('first@example.com', 'second@example.com', 'third@example.com')
+        FlakyEmailBackend.disconnects = 1
+
+        self.assertEqual(drain_outbox(), (3, 0))
+
+        self.assertEqual(FlakyEmailBackend.opened, 2)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.SENT).exists())
+        self.assertFalse(OutboxEmail.objects.filter(attempts__gt=0).exists())
+
+    def test_outage_releases_batch(self):
+        self.enqueue('first@example.com', 'second@example.com')
+        FlakyEmailBackend.disconnects = 10
+
+        with self.assertRaises(OutboxConnectionError):
+            drain_outbox()
+
+        self.assertEqual(FlakyEmailBackend.opened, 2)
+        self.assertEqual(
+            list(OutboxEmail.objects.values_list('status', 'attempts')),
+            [(OutboxEmail.PENDING, 0)] * 2,
+        )
+        self.assertFalse(OutboxEmail.objects.filter(next_attempt_at__gt=timezone.now()).exists())
+
+
+class OrderCompletedEmailTest(MainTestCase):
+    """Письмо о завершении заказа ставится в очередь один раз."""
+
+    def test_repeated_completion_queues_one_email(self):
+        order = self.create_order()
+
+        self.assertTrue(update_order(order, {'status': Order.COMPLETED}))
+        self.assertFalse(update_order(order, {'status': Order.COMPLETED}))
+
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+        self.assertEqual(drain_outbox(), (1, 0))
+        self.assertEqual(mail.outbox[0].to, [self.customer.email])
@@ -0,0 +1,107 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+
+
+ADMINISTRATOR = 'Администратор'
+EMPLOYEE = 'Работник'
+CUSTOMER = 'Клиент'
+
+GROUPS_CACHE_KEY = 'roles:groups'
+VERSION_CACHE_KEY = 'roles:version'
+USER_CACHE_KEY = 'roles:user:{version}:{user_id}'
+
+
+def get_group_ids() -> dict:
+    """
+    Возвращает соответствие названия группы ее идентификатору.
+    Кэшируется до изменения групп, но не дольше ROLES_CACHE_TIMEOUT.
+    """
+    group_ids = cache.get(GROUPS_CACHE_KEY)
+    if group_ids is None:
+        group_ids = dict(Group.objects.values_list('name', 'id'))
+        cache.set(GROUPS_CACHE_KEY, group_ids, timeout=settings.ROLES_CACHE_TIMEOUT)
+    return group_ids
+
+
+def _get_version() -> int:
+    return cache.get_or_set(VERSION_CACHE_KEY, time.time_ns, timeout=None)
+
+
+def get_user_role_ids(user) -> frozenset:
+    """
+    Возвращает идентификаторы групп пользователя.
+    Результат запоминается на объекте пользователя на время запроса
+    и кэшируется между запросами до изменения состава групп,
+    но не дольше ROLES_CACHE_TIMEOUT.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    role_ids = getattr(user, '_role_ids', None)
+    if role_ids is None:
+        key = USER_CACHE_KEY.format(version=_get_version(), user_id=user.pk)
+        role_ids = cache.get(key)
+        if role_ids is None:
+            role_ids = frozenset(user.groups.values_list('id', flat=True))
+            cache.set(key, role_ids, timeout=settings.ROLES_CACHE_TIMEOUT)
+        user._role_ids = role_ids
+    return role_ids
+
+
+def has_role(user, name: str) -> bool:
+    """Проверяет, состоит ли пользователь в группе с указанным названием."""
+    group_id = get_group_ids().get(name)
+    return group_id is not None and group_id in get_user_role_ids(user)
+
+
+async def aget_group_ids() -> dict:
+    """Асинхронный вариант get_group_ids."""
+    group_ids = await cache.aget(GROUPS_CACHE_KEY)
+    if group_ids is None:
+        group_ids = {name: pk async for name, pk in Group.objects.values_list('name', 'id')}
+        await cache.aset(GROUPS_CACHE_KEY, group_ids, timeout=settings.ROLES_CACHE_TIMEOUT)
+    return group_ids
+
+
+async def aget_user_role_ids(user) -> frozenset:
+    """
+    Асинхронный вариант get_user_role_ids. Запоминает результат на объекте
+    пользователя, поэтому после вызова синхронные проверки не обращаются к базе.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    role_ids = getattr(user, '_role_ids', None)
+    if role_ids is None:
+        version = await cache.aget_or_set(VERSION_CACHE_KEY, time.time_ns, timeout=None)
+        key = USER_CACHE_KEY.format(version=version, user_id=user.pk)
+        role_ids = await cache.aget(key)
+        if role_ids is None:
+            role_ids = frozenset([pk async for pk in user.groups.values_list('id', flat=True)])
+            await cache.aset(key, role_ids, timeout=settings.ROLES_CACHE_TIMEOUT)
+        user._role_ids = role_ids
+    return role_ids
+
+
+async def ahas_role(user, name: str) -> bool:
+    """Асинхронный вариант has_role."""
+    group_id = (await aget_group_ids()).get(name)
+    return group_id is not None and group_id in await aget_user_role_ids(user)
+
+
+def invalidate_groups():
+    """Сбрасывает кэш групп и ролей всех пользователей."""
+    cache.delete(GROUPS_CACHE_KEY)
+    cache.set(VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate_users(user_ids):
+    """Сбрасывает кэш ролей указанных пользователей."""
+    version = _get_version()
+    cache.delete_many([
+        USER_CACHE_KEY.format(version=version, user_id=user_id)
+        for user_id in user_ids
+    ])
@@ -0,0 +1,30 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import roles
+from .models import CustomUser
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_groups(sender, **kwargs):
+    """Сбрасывает кэш ролей при изменении или удалении группы."""
+    roles.invalidate_groups()
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def invalidate_user_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    """Сбрасывает кэш ролей пользователей при изменении их групп."""
+    if not action.startswith('post_'):
+        return
+
+    if not reverse:
+        roles.invalidate_users([instance.pk])
+        if hasattr(instance, '_role_ids'):
+            del instance._role_ids
+    elif pk_set:
+        roles.invalidate_users(pk_set)
+    else:
+        # Группа очищена целиком: состав затронутых пользователей неизвестен
+        roles.invalidate_groups()
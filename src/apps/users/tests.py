@@ -1,3 +1,51 @@
-from django.test import TestCase
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apps.users import roles
+from apps.users.models import CustomUser
+from apps.users.roles import ADMINISTRATOR, EMPLOYEE
+from config.testing import CacheIsolatedTestCase
+
+
+class TokenRolesTest(CacheIsolatedTestCase):
+    """Токены выдаются с ролями из базы, даже если кэш ролей устарел."""
+
+    def setUp(self):
+        super().setUp()
+        self.administrator_group = Group.objects.create(name=ADMINISTRATOR)
+        self.employee_group = Group.objects.create(name=EMPLOYEE)
+        self.user = CustomUser.objects.create_user('admin@example.com', 'password')
+        self.user.groups.set([self.administrator_group])
+        self.client = APIClient()
+
+    def obtain(self):
+        response = self.client.post(
+            '/api/v1/token/', {'email': 'admin@example.com', 'password': 'password'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def make_role_cache_stale(self, role_ids):
+        """Возвращает в кэш прежние роли, как в процессе, до которого не дошел сброс."""
+        key = roles.USER_CACHE_KEY.format(version=roles._get_version(), user_id=self.user.pk)
+        cache.set(key, frozenset(role_ids), timeout=None)
+
+    def test_refresh_rejected_after_demotion(self):
+        tokens = self.obtain()
+        self.user.groups.set([self.employee_group])
+        self.make_role_cache_stale([self.administrator_group.pk])
+
+        response = self.client.post('/api/v1/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], 'Роли пользователя изменились, необходимо войти заново')
+
+    def test_obtain_ignores_stale_cache(self):
+        self.user.groups.set([self.employee_group])
+        self.make_role_cache_stale([self.administrator_group.pk])
+
+        tokens = self.obtain()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+
+        self.assertEqual(self.client.get('/api/v1/slow_queries/').status_code, 403)
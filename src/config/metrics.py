@@ -0,0 +1,327 @@
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from functools import lru_cache
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.utils.module_loading import import_string
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+UNMATCHED = 'unmatched'
+
+# Запросы к базе текущего HTTP-запроса. Контекст копируется в sync_to_async,
+# поэтому запросы асинхронных представлений тоже учитываются.
+_request_queries = ContextVar('request_queries', default=None)
+
+_local = threading.local()
+# Счетчики всех потоков процесса и процесс, которому они принадлежат
+_stores = []
+_owner = {'pid': None, 'key': None}
+_next_flush = 0.0
+
+
+class QueryStats:
+    """Количество и суммарное время запросов к базе за HTTP-запрос."""
+
+    __slots__ = ('request', 'count', 'duration')
+
+    def __init__(self, request):
+        self.request = request
+        self.count = 0
+        self.duration = 0.0
+
+
+class MetricsStore:
+    """
+    Счетчики одного потока. Изменяются только своим потоком, поэтому
+    запись идет без блокировок, а /metrics читает копии словарей.
+
+    Атрибуты:
+        requests (dict): (представление, метод) -> [корзины гистограммы..., сумма
+            длительностей, количество запросов к базе, время в базе].
+        statuses (dict): (представление, метод, код ответа) -> количество ответов.
+    """
+
+    def __init__(self):
+        self.requests = {}
+        self.statuses = {}
+
+
+def get_process_key() -> str:
+    """Возвращает ключ процесса. После fork счетчики родителя сбрасываются."""
+    pid = os.getpid()
+    if _owner['pid'] != pid:
+        _owner.update(pid=pid, key=f'{pid}-{uuid.uuid4().hex[:8]}')
+        _stores.clear()
+        _local.__dict__.clear()
+    return _owner['key']
+
+
+def get_store() -> MetricsStore:
+    get_process_key()
+    store = getattr(_local, 'store', None)
+    if store is None:
+        store = _local.store = MetricsStore()
+        _stores.append(store)
+    return store
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _request_queries.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.duration += time.perf_counter() - started
+
+
+def get_current_request():
+    """Возвращает HTTP-запрос, в рамках которого выполняется код, или None."""
+    stats = _request_queries.get()
+    return stats.request if stats is not None else None
+
+
+@lru_cache(maxsize=None)
+def get_execute_wrappers() -> tuple:
+    return tuple(import_string(path) for path in settings.DB_EXECUTE_WRAPPERS)
+
+
+def install_execute_wrappers(sender, connection, **kwargs):
+    """Подключает обертки из DB_EXECUTE_WRAPPERS к каждому новому соединению с базой."""
+    for wrapper in get_execute_wrappers():
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+
+connection_created.connect(install_execute_wrappers)
+
+
+def get_view_name(request) -> str:
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED
+    return match.view_name or match.route
+
+
+def record_request(request, response, duration, queries):
+    buckets = settings.METRICS_LATENCY_BUCKETS
+    store = get_store()
+    view = get_view_name(request)
+
+    key = (view, request.method)
+    values = store.requests.get(key)
+    if values is None:
+        values = store.requests[key] = [0] * (len(buckets) + 1) + [0.0, 0, 0.0]
+    values[bisect.bisect_left(buckets, duration)] += 1
+    values[-3] += duration
+    values[-2] += queries.count
+    values[-1] += queries.duration
+
+    status_key = (view, request.method, str(response.status_code))
+    store.statuses[status_key] = store.statuses.get(status_key, 0) + 1
+
+
+def collect_local() -> tuple:
+    """Суммирует счетчики потоков текущего процесса."""
+    get_process_key()
+    requests, statuses = {}, {}
+    for store in list(_stores):
+        merge(requests, statuses, store.requests.copy().items(), store.statuses.copy().items())
+    return requests, statuses
+
+
+def merge(requests, statuses, request_items, status_items):
+    for key, values in request_items:
+        total = requests.get(key)
+        if total is None:
+            requests[key] = list(values)
+        else:
+            requests[key] = [a + b for a, b in zip(total, values)]
+    for key, count in status_items:
+        statuses[key] = statuses.get(key, 0) + count
+
+
+def flush():
+    """Сохраняет счетчики процесса в METRICS_DIR."""
+    if not settings.METRICS_DIR:
+        return
+
+    directory = Path(settings.METRICS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    requests, statuses = collect_local()
+    data = {
+        'requests': [[*key, values] for key, values in requests.items()],
+        'statuses': [[*key, count] for key, count in statuses.items()],
+    }
+    path = directory / f'{get_process_key()}.json'
+    temp_path = path.with_name(f'.{path.name}.{threading.get_ident()}.tmp')
+    temp_path.write_text(json.dumps(data))
+    os.replace(temp_path, path)
+
+
+def is_flush_due() -> bool:
+    global _next_flush
+    if not settings.METRICS_DIR:
+        return False
+    now = time.monotonic()
+    if now < _next_flush:
+        return False
+    _next_flush = now + settings.METRICS_FLUSH_INTERVAL
+    return True
+
+
+atexit.register(flush)
+
+
+def collect() -> tuple:
+    """
+    Возвращает счетчики всех процессов: из файлов METRICS_DIR,
+    включая файлы завершившихся процессов, или только текущего процесса.
+    """
+    if not settings.METRICS_DIR:
+        return collect_local()
+
+    flush()
+    requests, statuses = {}, {}
+    for path in Path(settings.METRICS_DIR).glob('*.json'):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        merge(
+            requests, statuses,
+            ((tuple(item[:2]), item[2]) for item in data['requests']),
+            ((tuple(item[:3]), item[3]) for item in data['statuses']),
+        )
+    return requests, statuses
+
+
+def format_labels(**labels) -> str:
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def render(requests, statuses) -> str:
+    """Формирует текст метрик в формате Prometheus."""
+    buckets = [*map(str, settings.METRICS_LATENCY_BUCKETS), '+Inf']
+    lines = [
+        '# HELP http_request_duration_seconds Длительность обработки запроса.',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    for (view, method), values in sorted(requests.items()):
+        cumulative = 0
+        for bound, count in zip(buckets, values):
+            cumulative += count
+            lines.append(
+                f'http_request_duration_seconds_bucket{format_labels(view=view, method=method, le=bound)} {cumulative}'
+            )
+        labels = format_labels(view=view, method=method)
+        lines.append(f'http_request_duration_seconds_sum{labels} {values[-3]}')
+        lines.append(f'http_request_duration_seconds_count{labels} {cumulative}')
+
+    lines += [
+        '# HELP http_request_db_queries_total Количество запросов к базе.',
+        '# TYPE http_request_db_queries_total counter',
+    ]
+    lines += (
+        f'http_request_db_queries_total{format_labels(view=view, method=method)} {values[-2]}'
+        for (view, method), values in sorted(requests.items())
+    )
+
+    lines += [
+        '# HELP http_request_db_duration_seconds_total Время выполнения запросов к базе.',
+        '# TYPE http_request_db_duration_seconds_total counter',
+    ]
+    lines += (
+        f'http_request_db_duration_seconds_total{format_labels(view=view, method=method)} {values[-1]}'
+        for (view, method), values in sorted(requests.items())
+    )
+
+    lines += [
+        '# HELP http_responses_total Количество ответов по кодам.',
+        '# TYPE http_responses_total counter',
+    ]
+    lines += (
+        f'http_responses_total{format_labels(view=view, method=method, status=status)} {count}'
+        for (view, method, status), count in sorted(statuses.items())
+    )
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """
+    Собирает длительность, количество запросов к базе и время в базе
+    для каждого представления и метода HTTP. Для потоковых ответов
+    учитывается время до начала отдачи.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Соединения, открытые до загрузки middleware
+        for connection in connections.all(initialized_only=True):
+            install_execute_wrappers(type(connection), connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        queries = QueryStats(request)
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+
+        record_request(request, response, time.perf_counter() - started, queries)
+        if is_flush_due():
+            flush()
+        return response
+
+    async def __acall__(self, request):
+        queries = QueryStats(request)
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+
+        record_request(request, response, time.perf_counter() - started, queries)
+        if is_flush_due():
+            await sync_to_async(flush)()
+        return response
+
+
+def metrics_view(request):
+    """Отдает метрики в текстовом формате Prometheus. Без METRICS_TOKEN недоступно."""
+    if not settings.METRICS_TOKEN:
+        raise Http404
+    if not constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {settings.METRICS_TOKEN}',
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(render(*collect()), content_type=CONTENT_TYPE)
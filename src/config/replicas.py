@@ -0,0 +1,126 @@
+import hashlib
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+PRIMARY = 'default'
+
+# Можно ли читать с реплик в текущем запросе. Вне запросов
+# (команды, фоновые задачи) все запросы идут в основную базу.
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+STICKY_CACHE_PREFIX = 'replicas:sticky:'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def get_replicas() -> list:
+    return settings.DATABASE_REPLICAS
+
+
+def get_client_addr(request) -> str:
+    """
+    Адрес клиента: из заголовка REPLICA_CLIENT_ADDR_HEADER, если он задан
+    (последний адрес в списке добавлен доверенным прокси), иначе REMOTE_ADDR.
+    """
+    if settings.REPLICA_CLIENT_ADDR_HEADER:
+        forwarded = request.META.get(settings.REPLICA_CLIENT_ADDR_HEADER, '')
+        addr = forwarded.rsplit(',', 1)[-1].strip()
+        if addr:
+            return addr
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def get_client_key(request) -> str:
+    """
+    Ключ клиента для привязки к основной базе после записи.
+    Middleware работает до аутентификации DRF, поэтому клиент
+    определяется по заголовку авторизации, сессии или адресу.
+    """
+    identity = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or get_client_addr(request)
+    )
+    return STICKY_CACHE_PREFIX + hashlib.sha256(identity.encode()).hexdigest()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Разрешает читать с реплик в безопасных запросах. После изменяющего запроса
+    клиент на REPLICA_STICKY_SECONDS читает из основной базы, чтобы видеть
+    свои изменения, пока они не дошли до реплик.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not get_replicas():
+            return self.get_response(request)
+
+        key = get_client_key(request)
+        is_safe = request.method in SAFE_METHODS
+        token = _read_from_replica.set(is_safe and not cache.get(key))
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+
+        if not is_safe:
+            cache.set(key, True, timeout=settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        if not get_replicas():
+            return await self.get_response(request)
+
+        key = get_client_key(request)
+        is_safe = request.method in SAFE_METHODS
+        token = _read_from_replica.set(is_safe and not await cache.aget(key))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+
+        if not is_safe:
+            await cache.aset(key, True, timeout=settings.REPLICA_STICKY_SECONDS)
+        return response
+
+
+class PrimaryReplicaRouter:
+    """Направляет запись в основную базу, а чтение в безопасных запросах — на реплики."""
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if not replicas or not _read_from_replica.get():
+            return PRIMARY
+        # Внутри транзакции читаем там же, где пишем
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # После записи оставшиеся запросы этого запроса читают из основной базы
+        _read_from_replica.set(False)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему вместе с данными из основной базы
+        return db == PRIMARY
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from drf_yasg import openapi
+from drf_yasg.app_settings import swagger_settings
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.renderers import _SpecRenderer
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+API_INFO = openapi.Info(
+    title="Snippets API",
+    default_version='v1',
+    description="Test description",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@snippets.local"),
+    license=openapi.License(name="BSD License"),
+)
+
+CODECS = {
+    'json': OpenAPICodecJson,
+    'yaml': OpenAPICodecYaml,
+}
+
+# Отрисованные схемы процесса: {(версия, формат): (содержимое, ETag)}
+_documents = {}
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_code_version() -> str:
+    """
+    Возвращает версию кода из настройки CODE_VERSION, а если она не задана,
+    хэш путей, размеров и времени изменения исходных файлов проекта.
+    """
+    if settings.CODE_VERSION:
+        return settings.CODE_VERSION
+
+    source_dir = settings.BASE_DIR.parent
+    digest = hashlib.md5()
+    for path in sorted(source_dir.rglob('*.py')):
+        stat = path.stat()
+        digest.update(f'{path.relative_to(source_dir)}:{stat.st_size}:{stat.st_mtime_ns}\n'.encode())
+    return digest.hexdigest()
+
+
+def get_schema_path(version, schema_format):
+    return settings.OPENAPI_SCHEMA_DIR / f'openapi-{version}.{schema_format}'
+
+
+def generate_schema():
+    """
+    Генерирует публичную схему API от имени анонимного пользователя.
+    Адрес API берется из DEFAULT_API_URL, а не из запроса: пустой адрес
+    не попадает в схему, и клиенты используют тот, с которого ее получили.
+    """
+    generator = swagger_settings.DEFAULT_GENERATOR_CLASS(
+        swagger_settings.DEFAULT_INFO, url=swagger_settings.DEFAULT_API_URL or '',
+    )
+    request = APIView().initialize_request(APIRequestFactory().get('/swagger.json'))
+    return generator.get_schema(request=request, public=True)
+
+
+def write_schema_files(version, schema_formats=tuple(CODECS)) -> list:
+    """Генерирует схему и записывает ее в указанных форматах. Возвращает пути файлов."""
+    schema = generate_schema()
+    settings.OPENAPI_SCHEMA_DIR.mkdir(parents=True, exist_ok=True)
+
+    paths = []
+    for schema_format in schema_formats:
+        path = get_schema_path(version, schema_format)
+        # Запись через временный файл: другие процессы не прочитают файл наполовину
+        temp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        temp_path.write_bytes(CODECS[schema_format](validators=[]).encode(schema))
+        os.replace(temp_path, path)
+        paths.append(path)
+    return paths
+
+
+def get_schema_document(schema_format) -> tuple:
+    """
+    Возвращает содержимое схемы в формате json или yaml и ее ETag.
+    Схема берется из памяти процесса, затем из файла текущей версии кода,
+    и генерируется, только если файла еще нет.
+    """
+    version = get_code_version()
+    document = _documents.get((version, schema_format))
+    if document is None:
+        with _lock:
+            document = _documents.get((version, schema_format))
+            if document is None:
+                path = get_schema_path(version, schema_format)
+                if not path.exists():
+                    write_schema_files(version, [schema_format])
+                content = path.read_bytes()
+                document = content, f'"{hashlib.md5(content).hexdigest()}"'
+                _documents[version, schema_format] = document
+    return document
+
+
+class CachedSchemaView(get_schema_view(API_INFO, public=True, permission_classes=[permissions.AllowAny])):
+    """
+    Отдает схему API, сгенерированную один раз для версии кода,
+    с ETag для условных запросов. Страницы Swagger UI и ReDoc
+    загружают схему через этот же путь (?format=openapi).
+    """
+
+    def get(self, request, version='', format=None):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, _SpecRenderer):
+            return super().get(request, version, format)
+
+        schema_format = 'yaml' if issubclass(renderer.codec_class, OpenAPICodecYaml) else 'json'
+        content, etag = get_schema_document(schema_format)
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            # Ответ 304 должен содержать тот же ETag, что и полный ответ
+            not_modified['ETag'] = etag
+            return not_modified
+
+        response = HttpResponse(content, content_type=f'{renderer.media_type}; charset={renderer.charset}')
+        response['ETag'] = etag
+        return response
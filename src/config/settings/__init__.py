@@ -1,12 +1,16 @@
 from .apps import *
 from .auth import *
 from .base import *
+from .cache import *
 from .database import *
 from .internationalization import *
 from .media import *
+from .metrics import *
 from .middleware import *
 from .password_validation import *
 from .rest_framework import *
+from .scheduling import *
 from .smtp import *
 from .static import *
+from .swagger import *
 from .templates import *
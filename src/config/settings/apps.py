@@ -13,4 +13,5 @@ INSTALLED_APPS = [
     # my apps
     'apps.main.apps.MainConfig',
     'apps.users.apps.UsersConfig',
+    'apps.notifications.apps.NotificationsConfig',
 ]
@@ -0,0 +1,52 @@
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+import os
+
+
+# Кэш ролей, версии справочников, сводки клиентов и привязка к основной базе
+# сбрасываются только в процессе, изменившем данные. При нескольких процессах
+# (воркерах gunicorn) нужен общий для них кэш: CACHE_URL=redis://... (нужен
+# пакет redis) или CACHE_URL=file:///путь/к/каталогу для процессов одного сервера.
+# Без CACHE_URL кэш хранится в памяти процесса.
+CACHE_URL = os.getenv('CACHE_URL', '')
+
+if CACHE_URL.startswith(('redis://', 'rediss://', 'unix://')):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+elif CACHE_URL.startswith('file://'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_URL.removeprefix('file://'),
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'car-wash',
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            },
+        }
+    }
+
+# Время жизни кэша ролей пользователей, с. Ограничивает время, в течение
+# которого процесс может видеть устаревшие роли, если сброс до него не дошел
+ROLES_CACHE_TIMEOUT = 60
+
+# Время жизни закэшированных ответов справочников (сбрасываются при изменении)
+CATALOG_CACHE_TIMEOUT = 60 * 60
+
+# Сводка клиента (/me/dashboard/): время жизни в кэше (сбрасывается при изменении
+# заказов и машин клиента) и количество активных и последних завершенных заказов в ней
+DASHBOARD_CACHE_TIMEOUT = 10 * 60
+DASHBOARD_ORDERS_LIMIT = 10
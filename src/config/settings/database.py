@@ -1,6 +1,7 @@
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+import copy
 import os
 
 from .base import BASE_DIR
@@ -10,7 +11,49 @@ DB_DIR = os.path.dirname(BASE_DIR)
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'config.sqlite3',
         'NAME': os.path.join(DB_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            'transaction_mode': os.getenv('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+            'pragmas': {
+                # WAL: читатели не блокируются пишущим процессом
+                'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+                # В режиме WAL NORMAL не теряет целостность, но реже вызывает fsync
+                'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+                # Сколько миллисекунд ждать освобождения блокировки
+                'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+                'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+                # Отрицательное значение задает размер кэша страниц в КиБ
+                'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64 * 1024)),
+                'temp_store': 'MEMORY',
+            },
+        },
     }
 }
+
+# Повтор записи при "database is locked"
+SQLITE_LOCK_RETRIES = int(os.getenv('SQLITE_LOCK_RETRIES', 5))
+SQLITE_LOCK_RETRY_BASE_DELAY = 0.05
+SQLITE_LOCK_RETRY_MAX_DELAY = 1.0
+
+# Реплики для чтения: пути к файлам SQLite через запятую.
+# Локально реплики заполняются командой sync_sqlite_replicas.
+DATABASE_REPLICAS = []
+for index, name in enumerate(filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = {
+        **copy.deepcopy(DATABASES['default']),
+        'NAME': name.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['config.replicas.PrimaryReplicaRouter']
+
+# Сколько секунд после записи клиент читает из основной базы.
+# Для нескольких процессов нужен общий для них кэш.
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
+# Заголовок (ключ request.META), в который доверенный прокси пишет адрес клиента,
+# например HTTP_X_FORWARDED_FOR. За прокси REMOTE_ADDR — адрес самого прокси, и
+# анонимные клиенты без этого заголовка привязываются к основной базе все сразу.
+REPLICA_CLIENT_ADDR_HEADER = os.getenv('REPLICA_CLIENT_ADDR_HEADER', '')
@@ -2,3 +2,19 @@ from .base import BASE_DIR
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Ограничения на фото машин клиентов
+# Временные файлы загрузок лежат на том же диске, что и медиафайлы,
+# чтобы перенос на место был атомарным переименованием, а не копированием
+CAR_IMAGE_UPLOAD_TEMP_DIR = MEDIA_ROOT / '.uploads'
+CAR_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+CAR_IMAGE_MAX_PIXELS = 40_000_000
+CAR_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+# Копии фото машин клиентов
+CAR_IMAGE_THUMBNAIL_SIZE = (320, 320)
+CAR_IMAGE_WEBP_SIZE = (1280, 1280)
+CAR_IMAGE_WEBP_QUALITY = 80
+# Создавать копии в фоновом потоке после сохранения (иначе сразу после коммита)
+CAR_IMAGE_VARIANTS_ASYNC = True
+CAR_IMAGE_VARIANTS_WORKERS = 2
@@ -0,0 +1,32 @@
+# Метрики запросов в формате Prometheus (config.metrics) и медленные запросы
+
+import os
+
+
+# Общий каталог, в который процессы сохраняют свои счетчики для объединения
+# в /metrics. Если не задан, /metrics отдает только счетчики текущего процесса.
+# Каталог нужно очищать при перезапуске сервиса.
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+
+# Как часто процесс сохраняет счетчики в METRICS_DIR, с
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+# Границы корзин гистограммы длительности запросов, с
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Токен для доступа к /metrics (заголовок Authorization: Bearer <токен>).
+# Если не задан, /metrics отключен и отвечает 404.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Обертки выполнения запросов, подключаемые к каждому соединению с базой.
+# Внешние идут первыми: EXPLAIN медленных запросов не попадает во время в базе.
+DB_EXECUTE_WRAPPERS = (
+    'config.slow_queries.capture_slow_query',
+    'config.metrics.record_query',
+)
+
+# Медленные запросы (config.slow_queries): порог длительности, с,
+# доля проверяемых запросов и размер кольцевого буфера процесса
+SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', 0.1))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv('SLOW_QUERY_SAMPLE_RATE', 1))
+SLOW_QUERY_BUFFER_SIZE = int(os.getenv('SLOW_QUERY_BUFFER_SIZE', 200))
@@ -1,5 +1,8 @@
 MIDDLEWARE = [
+    # Первым, чтобы учитывать время и запросы к базе остальных middleware
+    'config.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'config.replicas.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
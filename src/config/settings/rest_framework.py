@@ -1,3 +1,5 @@
+import os
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 3,
@@ -8,8 +10,18 @@ REST_FRAMEWORK = {
     ),
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.auth.auth.RoleJWTAuthentication',
         'rest_framework.authentication.BasicAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     )
 }
+
+# Максимальный размер страницы при выводе по курсору
+CURSOR_PAGINATION_MAX_PAGE_SIZE = 100
+
+# Отдавать списки через сериализаторы, скомпилированные в сборку из .values()
+COMPILED_READ_SERIALIZERS = True
+
+# Обрабатывать чтение заказов, машин клиентов и справочников асинхронными
+# представлениями. Имеет смысл только при запуске под ASGI.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
@@ -0,0 +1,10 @@
+# Scheduling
+from datetime import timedelta
+
+
+# Максимальная длительность заказа. Ограничивает диапазон поиска
+# пересекающихся заказов по индексу (employee, start_date).
+ORDER_MAX_DURATION = timedelta(hours=24)
+
+# Максимальная ширина окна поиска свободного времени
+SCHEDULE_MAX_WINDOW = timedelta(days=31)
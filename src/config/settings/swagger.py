@@ -0,0 +1,22 @@
+# OpenAPI schema
+# https://drf-yasg.readthedocs.io/en/stable/settings.html
+
+import os
+
+from .base import BASE_DIR
+
+
+SWAGGER_SETTINGS = {
+    'DEFAULT_INFO': 'config.schema.API_INFO',
+    # Адрес API в схеме. Схема генерируется без запроса, поэтому
+    # без этой настройки клиенты используют адрес, с которого ее получили.
+    'DEFAULT_API_URL': os.getenv('API_URL') or None,
+}
+
+# Версия кода, задается при сборке (например, хэш коммита). Схема API
+# генерируется один раз на версию. Если не задана, версия вычисляется
+# по исходным файлам проекта при запуске процесса.
+CODE_VERSION = os.getenv('CODE_VERSION', '')
+
+# Каталог со сгенерированными файлами схемы (generate_openapi_schema)
+OPENAPI_SCHEMA_DIR = BASE_DIR / 'openapi'
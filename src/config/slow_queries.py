@@ -0,0 +1,104 @@
+import random
+import re
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .metrics import get_current_request, get_view_name
+
+WHITESPACE_RE = re.compile(r'\s+')
+# Повторяющиеся группы параметров: IN (%s, %s, ...) и VALUES (%s, %s), (%s, %s), ...
+REPEATED_PARAMS_RE = re.compile(r'%s(?:, %s)+')
+REPEATED_GROUPS_RE = re.compile(r'(\([^()]*\))(?:, \1)+')
+
+# Последние медленные запросы процесса. deque с maxlen вытесняет
+# старые записи, а append потокобезопасен без блокировок.
+_entries = deque(maxlen=settings.SLOW_QUERY_BUFFER_SIZE)
+# Планы по нормализованному SQL: повторный медленный запрос не выполняет EXPLAIN
+_plans = {}
+MAX_PLANS = 1000
+
+
+def normalize_sql(sql) -> str:
+    """Приводит SQL к виду, общему для запросов с разным числом параметров."""
+    sql = WHITESPACE_RE.sub(' ', sql).strip()
+    sql = REPEATED_PARAMS_RE.sub('%s, ...', sql)
+    return REPEATED_GROUPS_RE.sub(r'\1, ...', sql)
+
+
+def format_plan(connection, rows) -> str:
+    if connection.vendor != 'sqlite':
+        return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+    # EXPLAIN QUERY PLAN в SQLite: (id, parent, notused, detail), выводим деревом
+    depths = {}
+    lines = []
+    for node_id, parent_id, _, detail in rows:
+        depths[node_id] = depths.get(parent_id, -1) + 1
+        lines.append('  ' * depths[node_id] + detail)
+    return '\n'.join(lines)
+
+
+def explain(connection, sql, params):
+    """
+    Возвращает план запроса или None, если его не удалось получить.
+    Выполняется отдельным курсором в обход оберток соединения.
+    """
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+        return format_plan(connection, cursor.fetchall())
+    except DatabaseError:
+        return None
+    finally:
+        cursor.close()
+
+
+def get_plan(connection, sql, params, normalized):
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+
+    key = (connection.alias, normalized)
+    if key not in _plans:
+        if len(_plans) >= MAX_PLANS:
+            _plans.clear()
+        _plans[key] = explain(connection, sql, params)
+    return _plans[key]
+
+
+def record_slow_query(connection, sql, params, many, duration):
+    request = get_current_request()
+    normalized = normalize_sql(sql)
+    _entries.append({
+        'time': timezone.now(),
+        'duration_ms': round(duration * 1000, 3),
+        'database': connection.alias,
+        'view': get_view_name(request) if request is not None else None,
+        'method': request.method if request is not None else None,
+        'sql': normalized,
+        'plan': None if many else get_plan(connection, sql, params, normalized),
+    })
+
+
+def capture_slow_query(execute, sql, params, many, context):
+    """
+    Обертка выполнения запроса: записывает запросы дольше SLOW_QUERY_THRESHOLD
+    с планом выполнения. Проверяется доля SLOW_QUERY_SAMPLE_RATE запросов.
+    """
+    if random.random() >= settings.SLOW_QUERY_SAMPLE_RATE:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - started
+    if duration >= settings.SLOW_QUERY_THRESHOLD:
+        record_slow_query(context['connection'], sql, params, many, duration)
+    return result
+
+
+def get_slow_queries() -> list:
+    """Возвращает медленные запросы процесса, начиная с последнего."""
+    return list(reversed(_entries))
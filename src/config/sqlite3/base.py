@@ -0,0 +1,29 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Бэкенд SQLite с настройками для нескольких процессов.
+
+    Дополнительные ключи OPTIONS:
+        pragmas (dict): PRAGMA, выполняемые при каждом подключении.
+        transaction_mode (str): Режим BEGIN для транзакций (DEFERRED, IMMEDIATE).
+            В режиме IMMEDIATE блокировка на запись берется в начале транзакции,
+            поэтому пишущий процесс ждет ее в пределах busy_timeout, а не получает
+            "database is locked" при попытке повысить блокировку чтения.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop('pragmas', {})
+        self.transaction_mode = params.pop('transaction_mode', 'DEFERRED').upper()
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,19 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+# Тесты не должны очищать и разделять кэш, заданный через CACHE_URL
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'car-wash-tests',
+    }
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CacheIsolatedTestCase(TestCase):
+    """Тест с собственным кэшем в памяти, очищаемым перед каждым тестом."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
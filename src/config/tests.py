@@ -0,0 +1,209 @@
+import json
+import shutil
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import transaction
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.main.models import Order
+from apps.users.models import CustomUser
+from apps.users.roles import ADMINISTRATOR
+from config import metrics, schema, slow_queries
+from config.replicas import PRIMARY, PrimaryReplicaRouter, ReplicaRoutingMiddleware
+from config.testing import TEST_CACHES, CacheIsolatedTestCase
+
+REPLICA = 'replica1'
+
+
+@override_settings(CACHES=TEST_CACHES, DATABASE_REPLICAS=[REPLICA], REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTest(SimpleTestCase):
+    """
+    Чтение в безопасных запросах идет на реплику, после записи клиент
+    читает из основной базы. Проверяется выбор базы роутером внутри
+    middleware, без запросов к самим базам.
+    """
+
+    # Транзакция открывается в основной базе, запросы к ней не выполняются
+    databases = {PRIMARY}
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = PrimaryReplicaRouter()
+
+    def get_response(self, request):
+        if request.method == 'POST':
+            self.router.db_for_write(Order)
+        if request.GET.get('atomic'):
+            with transaction.atomic(using=PRIMARY):
+                request.read_db = self.router.db_for_read(Order)
+        else:
+            request.read_db = self.router.db_for_read(Order)
+        return request
+
+    def send(self, method, data=None, **extra):
+        request = getattr(self.factory, method)('/api/v1/orders/', data, **extra)
+        return ReplicaRoutingMiddleware(self.get_response)(request).read_db
+
+    def test_safe_read_uses_replica(self):
+        self.assertEqual(self.send('get'), REPLICA)
+
+    def test_write_pins_client_to_primary(self):
+        self.assertEqual(self.send('post', HTTP_AUTHORIZATION='Bearer first'), PRIMARY)
+
+        self.assertEqual(self.send('get', HTTP_AUTHORIZATION='Bearer first'), PRIMARY)
+        self.assertEqual(self.send('get', HTTP_AUTHORIZATION='Bearer second'), REPLICA)
+        with mock.patch('time.time', return_value=time.time() + 11):
+            self.assertEqual(self.send('get', HTTP_AUTHORIZATION='Bearer first'), REPLICA)
+
+    def test_read_inside_atomic_uses_primary(self):
+        self.assertEqual(self.send('get', {'atomic': '1'}), PRIMARY)
+
+    def test_anonymous_clients_behind_proxy(self):
+        self.send('post', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.1')
+
+        # Без заголовка прокси все клиенты за ним делят один адрес
+        self.assertEqual(self.send('get', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.2'), PRIMARY)
+        with self.settings(REPLICA_CLIENT_ADDR_HEADER='HTTP_X_FORWARDED_FOR'):
+            self.send('post', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.1')
+            self.assertEqual(
+                self.send('get', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='198.51.100.7, 203.0.113.1'), PRIMARY,
+            )
+            self.assertEqual(
+                self.send('get', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.2'), REPLICA,
+            )
+
+    async def test_async_safe_read_uses_replica(self):
+        async def get_response(request):
+            return self.get_response(request)
+
+        request = self.factory.get('/api/v1/orders/')
+        response = await ReplicaRoutingMiddleware(get_response)(request)
+
+        self.assertEqual(response.read_db, REPLICA)
+
+
+class SchemaViewTest(CacheIsolatedTestCase):
+    """Схема API генерируется один раз для версии кода и отдается с ETag."""
+
+    def setUp(self):
+        super().setUp()
+        schema_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, schema_dir)
+        settings_override = override_settings(OPENAPI_SCHEMA_DIR=Path(schema_dir), CODE_VERSION='test')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        documents = mock.patch.dict(schema._documents, clear=True)
+        documents.start()
+        self.addCleanup(documents.stop)
+        schema.get_code_version.cache_clear()
+        self.addCleanup(schema.get_code_version.cache_clear)
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get('/swagger.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('paths', json.loads(response.content))
+        etag = response['ETag']
+
+        # Схема читается из файла версии, а не генерируется заново
+        schema._documents.clear()
+        with mock.patch.object(schema, 'generate_schema', side_effect=AssertionError):
+            response = self.client.get('/swagger.json', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_stale_etag_gets_schema(self):
+        response = self.client.get('/swagger.json', HTTP_IF_NONE_MATCH='"stale"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], '"stale"')
+        self.assertIn('paths', json.loads(response.content))
+
+
+@override_settings(METRICS_TOKEN='secret', METRICS_DIR='')
+class MetricsTest(CacheIsolatedTestCase):
+    """/metrics доступен только по токену и отдает счетчики запросов."""
+
+    def get_metrics(self, token='secret'):
+        return self.client.get('/metrics', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def get_value(self, name, **labels) -> float:
+        prefix = name + metrics.format_labels(**labels) + ' '
+        text = self.get_metrics().content.decode()
+        return next((float(line[len(prefix):]) for line in text.splitlines() if line.startswith(prefix)), 0)
+
+    def test_counters(self):
+        labels = {'view': 'brand-list', 'method': 'GET'}
+        before = {
+            'responses': self.get_value('http_responses_total', **labels, status='401'),
+            'requests': self.get_value('http_request_duration_seconds_count', **labels),
+        }
+
+        self.assertEqual(self.client.get('/api/v1/brands/').status_code, 401)
+
+        response = self.get_metrics()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertEqual(self.get_value('http_responses_total', **labels, status='401'), before['responses'] + 1)
+        self.assertEqual(self.get_value('http_request_duration_seconds_count', **labels), before['requests'] + 1)
+
+    def test_wrong_token_rejected(self):
+        self.assertEqual(self.get_metrics('wrong').status_code, 403)
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_disabled_without_token(self):
+        self.assertEqual(self.get_metrics('').status_code, 404)
+
+
+@override_settings(SLOW_QUERY_THRESHOLD=0, SLOW_QUERY_SAMPLE_RATE=1)
+class SlowQueryTest(CacheIsolatedTestCase):
+    """Медленные запросы записываются с представлением и планом выполнения."""
+
+    def setUp(self):
+        super().setUp()
+        entries = mock.patch.object(slow_queries, '_entries', deque(maxlen=10))
+        entries.start()
+        self.addCleanup(entries.stop)
+        self.administrator = CustomUser.objects.create_user('admin@example.com', 'password')
+        self.administrator.groups.set([Group.objects.create(name=ADMINISTRATOR)])
+        self.client = APIClient()
+        self.client.force_authenticate(self.administrator)
+
+    def test_captured_with_view_and_plan(self):
+        self.client.get('/api/v1/brands/', {'id': [1, 2, 3]})
+
+        entries = self.client.get('/api/v1/slow_queries/').json()
+        entry = next(entry for entry in entries if 'main_brand' in entry['sql'])
+        self.assertEqual((entry['view'], entry['method']), ('brand-list', 'GET'))
+        self.assertTrue(entry['plan'])
+
+    def test_not_sampled(self):
+        with self.settings(SLOW_QUERY_SAMPLE_RATE=0):
+            self.client.get('/api/v1/brands/')
+
+        entries = self.client.get('/api/v1/slow_queries/').json()
+        self.assertFalse([entry for entry in entries if entry['view'] == 'brand-list'])
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            slow_queries.normalize_sql('SELECT *\n  FROM t WHERE id IN (%s, %s, %s)'),
+            'SELECT * FROM t WHERE id IN (%s, ...)',
+        )
+        self.assertEqual(
+            slow_queries.normalize_sql('INSERT INTO t VALUES (%s, %s), (%s, %s), (%s, %s)'),
+            'INSERT INTO t VALUES (%s, ...), ...',
+        )
+
+    def test_requires_administrator(self):
+        self.client.force_authenticate(CustomUser.objects.create_user('employee@example.com', 'password'))
+
+        self.assertEqual(self.client.get('/api/v1/slow_queries/').status_code, 403)